@@ -0,0 +1,40 @@
+"""Add weighted full-text search vector to grants
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+# Keep in sync with GRANT_SEARCH_VECTOR in app/models/grant.py
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(funder, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    # Stored generated column: Postgres backfills every existing row when it is added
+    # and keeps it current on every insert/update of name, funder or description
+    op.add_column(
+        'grants',
+        sa.Column('search_vector', TSVECTOR(), sa.Computed(SEARCH_VECTOR_SQL, persisted=True))
+    )
+    op.create_index('ix_grants_search_vector', 'grants', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_grants_search_vector', table_name='grants')
+    op.drop_column('grants', 'search_vector')
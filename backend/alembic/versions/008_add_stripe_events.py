@@ -0,0 +1,46 @@
+"""Add stripe_events table and index clients.subscription_id
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stripe_events',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('customer_id', sa.String(), nullable=True),
+        sa.Column('payload', JSONB(), nullable=False),
+        sa.Column('stripe_created_at', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        'ix_stripe_events_status_customer_id', 'stripe_events',
+        ['status', 'customer_id', 'stripe_created_at']
+    )
+
+    # Subscription and invoice webhooks look clients up by subscription id
+    op.create_index('ix_clients_subscription_id', 'clients', ['subscription_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_clients_subscription_id', table_name='clients')
+    op.drop_index('ix_stripe_events_status_customer_id', table_name='stripe_events')
+    op.drop_table('stripe_events')
@@ -0,0 +1,113 @@
+"""Store match reasons as lookup ids
+
+Rewrites name-based Match.reasons into the compact id form
+({"v": 2, "<category>": [ids], "issues": [categories]}) in batches.
+Rows whose names no longer resolve to exactly one lookup, and rows whose
+reasons are not a JSON object (e.g. JSON null), are left as they are; the
+API passes them through unchanged.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+REASONS_VERSION = 2
+
+# category -> (lookup table, name-based reasons key)
+CATEGORIES = {
+    'causes': ('causes', 'matching_causes'),
+    'applicant_types': ('applicant_types', 'matching_applicant_types'),
+    'provinces': ('provinces', 'matching_provinces'),
+    'eligibility_flags': ('eligibility_flags', 'matching_flags'),
+}
+CATEGORY_ISSUES = {
+    'causes': 'No matching causes',
+    'applicant_types': 'No matching applicant types',
+    'provinces': 'No matching provinces',
+}
+
+
+def _lookups(conn):
+    """(id by name, name by id) per category; ambiguous names map to None"""
+    ids_by_name, names_by_id = {}, {}
+    for category, (table, _) in CATEGORIES.items():
+        ids_by_name[category], names_by_id[category] = {}, {}
+        for lookup_id, name in conn.execute(sa.text(f'SELECT id, name FROM {table}')):
+            ids_by_name[category][name] = None if name in ids_by_name[category] else str(lookup_id)
+            names_by_id[category][str(lookup_id)] = name
+    return ids_by_name, names_by_id
+
+
+def _compact(reasons, ids_by_name):
+    issue_categories = {message: category for category, message in CATEGORY_ISSUES.items()}
+    compact = {'v': REASONS_VERSION}
+    for category, (_, key) in CATEGORIES.items():
+        ids = [ids_by_name[category].get(name) for name in reasons.get(key, [])]
+        if None in ids:
+            return None
+        if ids:
+            compact[category] = ids
+    issues = [issue_categories.get(message) for message in reasons.get('issues', [])]
+    if None in issues:
+        return None
+    if issues:
+        compact['issues'] = issues
+    return compact
+
+
+def _expand(reasons, names_by_id):
+    expanded = {
+        key: [names_by_id[category].get(lookup_id, lookup_id) for lookup_id in reasons.get(category, [])]
+        for category, (_, key) in CATEGORIES.items()
+    }
+    expanded['issues'] = [CATEGORY_ISSUES[category] for category in reasons.get('issues', [])]
+    return expanded
+
+
+def _rewrite(convert, upgrading):
+    """
+    Apply `convert` to every matches row still in the other format, BATCH_SIZE
+    rows at a time. Rows without reasons may hold JSON null rather than SQL
+    NULL, so only JSON objects are read.
+    """
+    conn = op.get_bind()
+    condition = "NOT (reasons ? 'v')" if upgrading else "reasons ? 'v'"
+    last_id = None
+    while True:
+        rows = conn.execute(sa.text(
+            f"SELECT id, reasons FROM matches WHERE jsonb_typeof(reasons) = 'object' AND {condition}"
+            + (" AND id > :last_id" if last_id else "")
+            + " ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for match_id, reasons in rows:
+            converted = convert(reasons)
+            if converted is not None:
+                updates.append({"id": match_id, "reasons": json.dumps(converted)})
+        if updates:
+            conn.execute(sa.text("UPDATE matches SET reasons = CAST(:reasons AS jsonb) WHERE id = :id"), updates)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    ids_by_name, _ = _lookups(op.get_bind())
+    _rewrite(lambda reasons: _compact(reasons, ids_by_name), upgrading=True)
+
+
+def downgrade() -> None:
+    _, names_by_id = _lookups(op.get_bind())
+    _rewrite(lambda reasons: _expand(reasons, names_by_id), upgrading=False)
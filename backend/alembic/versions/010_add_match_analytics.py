@@ -0,0 +1,37 @@
+"""Add match_analytics summary table
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+
+
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'match_analytics',
+        sa.Column('id', UUID(as_uuid=True), primary_key=True),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.Column('clients', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('grants', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pairs_scored', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('score_histogram', JSONB(), nullable=False),
+        sa.Column('coverage', JSONB(), nullable=False),
+        sa.Column('clients_without_high', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('clients_without_high_ids', JSONB(), nullable=False),
+    )
+    op.create_index('ix_match_analytics_computed_at', 'match_analytics', ['computed_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_match_analytics_computed_at', table_name='match_analytics')
+    op.drop_table('match_analytics')
@@ -0,0 +1,104 @@
+"""Add trigger-maintained eligibility id arrays to grants and clients
+
+Each association table (grant_causes, client_provinces, ...) gets statement-level
+triggers that rewrite the owner's uuid[] column from the table after every insert,
+update or delete, so the arrays can't drift from the rows the ORM writes. Existing
+rows are backfilled. GIN indexes let filters use && / @> and combine per-column
+index scans with BitmapAnd.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+# (owner table, owner column) -> [(association table, lookup column, array column)]
+ARRAYS = {
+    ('grants', 'grant_id'): [
+        ('grant_causes', 'cause_id', 'cause_ids'),
+        ('grant_applicant_types', 'applicant_type_id', 'applicant_type_ids'),
+        ('grant_provinces', 'province_id', 'province_ids'),
+        ('grant_eligibility_flags', 'flag_id', 'eligibility_flag_ids'),
+    ],
+    ('clients', 'client_id'): [
+        ('client_causes', 'cause_id', 'cause_ids'),
+        ('client_applicant_types', 'applicant_type_id', 'applicant_type_ids'),
+        ('client_provinces', 'province_id', 'province_ids'),
+        ('client_eligibility_flags', 'flag_id', 'eligibility_flag_ids'),
+    ],
+}
+
+# Args: owner table, owner column, lookup column, array column. Recomputes the array for
+# every owner touched by the statement (read from the transition tables)
+SYNC_FUNCTION = """
+CREATE FUNCTION sync_eligibility_ids() RETURNS trigger AS $$
+DECLARE
+    changed text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := format('SELECT %I FROM new_rows', TG_ARGV[1]);
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := format('SELECT %I FROM old_rows', TG_ARGV[1]);
+    ELSE
+        changed := format('SELECT %1$I FROM old_rows UNION SELECT %1$I FROM new_rows', TG_ARGV[1]);
+    END IF;
+    EXECUTE format(
+        'UPDATE %1$I AS owner SET %4$I = ARRAY('
+        'SELECT a.%3$I FROM %5$I AS a WHERE a.%2$I = owner.id ORDER BY a.%3$I'
+        ') WHERE owner.id IN (%6$s)',
+        TG_ARGV[0], TG_ARGV[1], TG_ARGV[2], TG_ARGV[3], TG_TABLE_NAME, changed
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Transition tables only allow one event per trigger
+TRIGGER_EVENTS = {
+    'insert': ('INSERT', 'NEW TABLE AS new_rows'),
+    'update': ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+    'delete': ('DELETE', 'OLD TABLE AS old_rows'),
+}
+
+
+def upgrade() -> None:
+    op.execute(SYNC_FUNCTION)
+
+    for (owner, owner_column), arrays in ARRAYS.items():
+        for table, lookup_column, array_column in arrays:
+            op.add_column(owner, sa.Column(
+                array_column, ARRAY(UUID(as_uuid=True)), nullable=False, server_default='{}'
+            ))
+            op.execute(
+                f"UPDATE {owner} AS owner SET {array_column} = ARRAY("
+                f"SELECT a.{lookup_column} FROM {table} AS a WHERE a.{owner_column} = owner.id ORDER BY a.{lookup_column})"
+            )
+            op.create_index(f'ix_{owner}_{array_column}', owner, [array_column], postgresql_using='gin')
+
+            for name, (trigger_event, transition_tables) in TRIGGER_EVENTS.items():
+                op.execute(
+                    f"CREATE TRIGGER {table}_sync_{name} AFTER {trigger_event} ON {table} "
+                    f"REFERENCING {transition_tables} FOR EACH STATEMENT EXECUTE FUNCTION "
+                    f"sync_eligibility_ids('{owner}', '{owner_column}', '{lookup_column}', '{array_column}')"
+                )
+
+
+def downgrade() -> None:
+    for owner, arrays in ARRAYS.items():
+        owner_table = owner[0]
+        for table, _, array_column in arrays:
+            for name in TRIGGER_EVENTS:
+                op.execute(f"DROP TRIGGER {table}_sync_{name} ON {table}")
+            op.drop_index(f'ix_{owner_table}_{array_column}', table_name=owner_table)
+            op.drop_column(owner_table, array_column)
+
+    op.execute("DROP FUNCTION sync_eligibility_ids()")
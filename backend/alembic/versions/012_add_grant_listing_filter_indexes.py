@@ -0,0 +1,47 @@
+"""Add indexes for multi-value, amount and deadline grant filters
+
+Adds a stored numrange column generated from amount_min/amount_max with a
+partial GiST index (grants with no amounts are left out), so amount filters
+are a range-overlap index scan. A (status, deadline_at, name, id) index serves
+deadline windows within a status and the listing's sort order. List-valued
+lookup filters use the GIN indexes on the id arrays from 011.
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import NUMRANGE
+
+
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+# Keep in sync with GRANT_AMOUNT_RANGE in app/models/grant.py
+AMOUNT_RANGE_SQL = (
+    "CASE WHEN amount_min IS NULL AND amount_max IS NULL THEN NULL "
+    "ELSE numrange(amount_min, CASE WHEN amount_max < amount_min THEN amount_min ELSE amount_max END, '[]') END"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        'grants',
+        sa.Column('amount_range', NUMRANGE(), sa.Computed(AMOUNT_RANGE_SQL, persisted=True))
+    )
+    op.create_index(
+        'ix_grants_amount_range', 'grants', ['amount_range'],
+        postgresql_using='gist', postgresql_where=sa.text('amount_range IS NOT NULL')
+    )
+    op.create_index('ix_grants_status_deadline_at', 'grants', ['status', 'deadline_at', 'name', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_grants_status_deadline_at', table_name='grants')
+    op.drop_index('ix_grants_amount_range', table_name='grants')
+    op.drop_column('grants', 'amount_range')
@@ -0,0 +1,50 @@
+"""Add composite indexes matching the list endpoints' keyset sort keys
+
+Each cursor page is a range scan on one of these in sort order: grants by
+(deadline_at, name, id), a client's matches by (fit_score DESC, id),
+clients by (name, id) and a client's messages by (sent_at DESC, id).
+The single-column or shorter indexes they extend are dropped.
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_grants_deadline_at_name_id', 'grants', ['deadline_at', 'name', 'id'])
+    op.drop_index('ix_grants_deadline_at', table_name='grants')
+
+    op.create_index(
+        'ix_matches_client_id_fit_score_id', 'matches', ['client_id', sa.text('fit_score DESC'), 'id']
+    )
+    op.drop_index('ix_matches_client_id', table_name='matches')
+
+    op.create_index('ix_clients_name_id', 'clients', ['name', 'id'])
+
+    op.create_index(
+        'ix_messages_client_id_sent_at_id', 'messages', ['client_id', sa.text('sent_at DESC'), 'id']
+    )
+    op.drop_index('ix_messages_client_id', table_name='messages')
+
+
+def downgrade() -> None:
+    op.create_index('ix_messages_client_id', 'messages', ['client_id', 'sent_at'])
+    op.drop_index('ix_messages_client_id_sent_at_id', table_name='messages')
+
+    op.drop_index('ix_clients_name_id', table_name='clients')
+
+    op.create_index('ix_matches_client_id', 'matches', ['client_id'])
+    op.drop_index('ix_matches_client_id_fit_score_id', table_name='matches')
+
+    op.create_index('ix_grants_deadline_at', 'grants', ['deadline_at'])
+    op.drop_index('ix_grants_deadline_at_name_id', table_name='grants')
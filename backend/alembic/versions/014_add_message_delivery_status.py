@@ -0,0 +1,28 @@
+"""Add delivery status and error to messages
+
+Outbox emails that run out of attempts are logged to the client's messages
+with status 'failed' and the last error, instead of only on email_outbox.
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('status', sa.String(), nullable=False, server_default='sent'))
+    op.add_column('messages', sa.Column('error', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('messages', 'error')
+    op.drop_column('messages', 'status')
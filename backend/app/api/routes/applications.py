@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 from app.core.database import get_db
-from app.core.security import get_current_user, get_current_staff_user
-from app.models.user import User
+from app.core.pagination import paginate
+from app.core.security import Principal, get_current_user, get_current_staff_user
 from app.models.application import Application, ApplicationEvent, ApplicationStage, EventType
 from app.models.match import Match, MatchStatus
 from app.schemas.application import (
@@ -19,29 +19,33 @@ router = APIRouter()
 # Stages that trigger client email notifications
 NOTIFY_STAGES = [ApplicationStage.submitted, ApplicationStage.awarded, ApplicationStage.declined]
 
+# Soonest internal deadline first, then most recently updated; id makes the key unique for cursors
+APPLICATION_SORT_KEYS = [
+    (Application.internal_deadline_at, False),
+    (Application.updated_at, True),
+    (Application.id, False),
+]
+
 
 @router.get("/", response_model=List[ApplicationResponse])
-async def list_applications(
+def list_applications(
+    response: Response,
     client_id: Optional[UUID] = None,
     stage: Optional[ApplicationStage] = None,
     assigned_to_user_id: Optional[UUID] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """List applications with optional filters"""
+    """List applications with optional filters (offset or cursor paging)"""
     query = db.query(Application)
     
     # If client user, only show their applications
     if current_user.role == "client":
-        # Get client IDs this user belongs to
-        from app.models.client import ClientUser
-        client_ids = [
-            cu.client_id for cu in 
-            db.query(ClientUser).filter(ClientUser.user_id == current_user.id).all()
-        ]
-        query = query.filter(Application.client_id.in_(client_ids))
+        # Client IDs this user belongs to (cached with the principal)
+        query = query.filter(Application.client_id.in_(current_user.client_ids))
     
     if client_id:
         query = query.filter(Application.client_id == client_id)
@@ -52,18 +56,13 @@ async def list_applications(
     if assigned_to_user_id:
         query = query.filter(Application.assigned_to_user_id == assigned_to_user_id)
     
-    applications = query.order_by(
-        Application.internal_deadline_at.asc().nullslast(),
-        Application.updated_at.desc()
-    ).offset(skip).limit(limit).all()
-    
-    return applications
+    return paginate(query, APPLICATION_SORT_KEYS, response, skip=skip, limit=limit, cursor=cursor)
 
 
 @router.get("/pipeline")
-async def get_pipeline(
+def get_pipeline(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Get application counts by stage for pipeline view"""
     from sqlalchemy import func
@@ -81,10 +80,10 @@ async def get_pipeline(
 
 
 @router.get("/{application_id}", response_model=ApplicationResponse)
-async def get_application(
+def get_application(
     application_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get application by ID"""
     application = db.query(Application).filter(Application.id == application_id).first()
@@ -93,22 +92,17 @@ async def get_application(
     
     # Check access for client users
     if current_user.role == "client":
-        from app.models.client import ClientUser
-        membership = db.query(ClientUser).filter(
-            ClientUser.user_id == current_user.id,
-            ClientUser.client_id == application.client_id
-        ).first()
-        if not membership:
+        if application.client_id not in current_user.client_ids:
             raise HTTPException(status_code=403, detail="Access denied")
     
     return application
 
 
 @router.post("/", response_model=ApplicationResponse)
-async def create_application(
+def create_application(
     app_data: ApplicationCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Create a new application"""
     application = Application(
@@ -149,11 +143,11 @@ async def create_application(
 
 
 @router.patch("/{application_id}", response_model=ApplicationResponse)
-async def update_application(
+def update_application(
     application_id: UUID,
     app_data: ApplicationUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Update an application"""
     application = db.query(Application).filter(Application.id == application_id).first()
@@ -197,11 +191,11 @@ async def update_application(
 
 
 @router.post("/{application_id}/events", response_model=ApplicationEventResponse)
-async def add_application_event(
+def add_application_event(
     application_id: UUID,
     event_data: ApplicationEventCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Add note or document request to application"""
     application = db.query(Application).filter(Application.id == application_id).first()
@@ -223,10 +217,10 @@ async def add_application_event(
 
 
 @router.get("/{application_id}/events", response_model=List[ApplicationEventResponse])
-async def get_application_events(
+def get_application_events(
     application_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get all events for an application"""
     application = db.query(Application).filter(Application.id == application_id).first()
@@ -241,10 +235,10 @@ async def get_application_events(
 
 
 @router.delete("/{application_id}")
-async def delete_application(
+def delete_application(
     application_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Delete an application"""
     application = db.query(Application).filter(Application.id == application_id).first()
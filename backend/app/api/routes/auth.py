@@ -12,7 +12,7 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
-async def login(
+def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -41,7 +41,7 @@ async def login(
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(
+def register(
     user_data: UserCreate,
     db: Session = Depends(get_db)
 ):
@@ -70,7 +70,7 @@ async def register(
 
 
 @router.post("/signup", response_model=PublicSignupResponse)
-async def public_signup(
+def public_signup(
     data: PublicSignupRequest,
     db: Session = Depends(get_db)
 ):
@@ -1,43 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 from app.core.database import get_db
-from app.core.security import get_current_user, get_current_staff_user, get_password_hash
+from app.core.pagination import paginate
+from app.core.security import Principal, get_current_user, get_current_staff_user, get_password_hash, invalidate_principal
 from app.models.user import User, UserRole
 from app.models.client import Client, ClientUser
 from app.models.lookup import Cause, ApplicantType, Province, EligibilityFlag
-from app.schemas.client import ClientCreate, ClientUpdate, ClientResponse, ClientEligibility, ClientUserCreate, ClientUserResponse, GrantAccessUpdate
+from app.schemas.client import ClientCreate, ClientUpdate, ClientResponse, ClientEligibility, ClientUserCreate, ClientUserResponse, GrantAccessUpdate, SimilarClient
 from app.schemas.message import MessageResponse
 from app.models.message import Message
+from app.services.matching import eligibility_ids
+from app.services.match_materializer import recompute_client_matches
+from app.services.similarity import IndexNotReady, client_similarity, client_tokens
 
 router = APIRouter()
 
+# Sort keys for cursor paging; id makes each key unique
+CLIENT_SORT_KEYS = [(Client.name, False), (Client.id, False)]
+MESSAGE_SORT_KEYS = [(Message.sent_at, True), (Message.id, False)]
+
 
 @router.get("/", response_model=List[ClientResponse])
-async def list_clients(
+def list_clients(
+    response: Response,
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
-    """List all clients"""
+    """List all clients (offset or cursor paging)"""
     query = db.query(Client)
     
     if search:
         search_term = f"%{search}%"
         query = query.filter(Client.name.ilike(search_term))
     
-    clients = query.order_by(Client.name).offset(skip).limit(limit).all()
-    return clients
+    return paginate(query, CLIENT_SORT_KEYS, response, skip=skip, limit=limit, cursor=cursor)
 
 
 @router.get("/{client_id}", response_model=ClientResponse)
-async def get_client(
+def get_client(
     client_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get client by ID"""
     client = db.query(Client).filter(Client.id == client_id).first()
@@ -46,11 +55,47 @@ async def get_client(
     return client
 
 
+@router.get("/{client_id}/similar", response_model=List[SimilarClient])
+def get_similar_clients(
+    client_id: UUID,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff_user)
+):
+    """Clients with the most similar eligibility profile, most similar first"""
+    tokens = client_tokens(db, [client_id])
+    if client_id not in tokens:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    # LSH candidates only, not a scan of every client
+    try:
+        similar = client_similarity.query(db, tokens[client_id], limit, exclude=client_id)
+    except IndexNotReady:
+        raise HTTPException(status_code=503, detail="Similarity index is still building", headers={"Retry-After": "30"})
+    
+    clients = {}
+    if similar:
+        clients = {row.id: row for row in db.query(Client.id, Client.name, Client.client_type).filter(
+            Client.id.in_([key for key, _ in similar])
+        ).all()}
+    
+    return [
+        SimilarClient(
+            client_id=key,
+            client_name=clients[key].name,
+            client_type=clients[key].client_type,
+            similarity=round(similarity, 4)
+        )
+        for key, similarity in similar
+        if key in clients  # Deleted since the index was refreshed
+    ]
+
+
 @router.post("/", response_model=ClientResponse)
-async def create_client(
+def create_client(
     client_data: ClientCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Create a new client"""
     client = Client(
@@ -80,11 +125,11 @@ async def create_client(
 
 
 @router.patch("/{client_id}", response_model=ClientResponse)
-async def update_client(
+def update_client(
     client_id: UUID,
     client_data: ClientUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Update client info"""
     client = db.query(Client).filter(Client.id == client_id).first()
@@ -102,17 +147,19 @@ async def update_client(
 
 
 @router.patch("/{client_id}/eligibility", response_model=ClientResponse)
-async def update_client_eligibility(
+def update_client_eligibility(
     client_id: UUID,
     eligibility: ClientEligibility,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Update client eligibility profile"""
     client = db.query(Client).filter(Client.id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
+    previous_eligibility = eligibility_ids(client)
     client.causes = db.query(Cause).filter(Cause.id.in_(eligibility.cause_ids)).all()
     client.applicant_types = db.query(ApplicantType).filter(ApplicantType.id.in_(eligibility.applicant_type_ids)).all()
     client.provinces = db.query(Province).filter(Province.id.in_(eligibility.province_ids)).all()
@@ -121,15 +168,19 @@ async def update_client_eligibility(
     db.commit()
     db.refresh(client)
     
+    # Stored matches for this client are stale if its profile changed
+    if eligibility_ids(client) != previous_eligibility:
+        background_tasks.add_task(recompute_client_matches, client.id)
+    
     return client
 
 
 @router.patch("/{client_id}/grant-access", response_model=ClientResponse)
-async def update_grant_access(
+def update_grant_access(
     client_id: UUID,
     access_data: GrantAccessUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """
     Manually grant or revoke grant database access for a client.
@@ -147,48 +198,53 @@ async def update_grant_access(
 
 
 @router.delete("/{client_id}")
-async def delete_client(
+def delete_client(
     client_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Delete a client"""
     client = db.query(Client).filter(Client.id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
+    member_ids = [row[0] for row in db.query(ClientUser.user_id).filter(ClientUser.client_id == client_id).all()]
+    
     db.delete(client)
     db.commit()
     
+    # Memberships are removed with the client
+    for user_id in member_ids:
+        invalidate_principal(user_id)
+    
     return {"message": "Client deleted"}
 
 
 @router.get("/{client_id}/messages", response_model=List[MessageResponse])
-async def get_client_messages(
+def get_client_messages(
     client_id: UUID,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all messages for a client"""
+    """Get all messages for a client, newest first (offset or cursor paging)"""
     client = db.query(Client).filter(Client.id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    messages = db.query(Message).filter(
-        Message.client_id == client_id
-    ).order_by(Message.sent_at.desc()).offset(skip).limit(limit).all()
-    
-    return messages
+    query = db.query(Message).filter(Message.client_id == client_id)
+    return paginate(query, MESSAGE_SORT_KEYS, response, skip=skip, limit=limit, cursor=cursor)
 
 
 # Client User Management
 @router.get("/{client_id}/users", response_model=List[ClientUserResponse])
-async def get_client_users(
+def get_client_users(
     client_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Get all users linked to a client"""
     client = db.query(Client).filter(Client.id == client_id).first()
@@ -214,11 +270,11 @@ async def get_client_users(
 
 
 @router.post("/{client_id}/users", response_model=ClientUserResponse)
-async def create_client_user(
+def create_client_user(
     client_id: UUID,
     user_data: ClientUserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Create a new user and link them to a client"""
     client = db.query(Client).filter(Client.id == client_id).first()
@@ -263,11 +319,11 @@ async def create_client_user(
 
 
 @router.delete("/{client_id}/users/{user_id}")
-async def remove_client_user(
+def remove_client_user(
     client_id: UUID,
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Remove a user from a client (optionally delete the user)"""
     client_user = db.query(ClientUser).filter(
@@ -291,5 +347,6 @@ async def remove_client_user(
         db.delete(user)
     
     db.commit()
+    invalidate_principal(user_id)
     
     return {"message": "Client user removed"}
@@ -1,32 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
 from app.core.database import get_db
-from app.core.security import get_current_user, get_current_staff_user
-from app.models.user import User
+from app.core.pagination import paginate
+from app.core.security import Principal, get_current_user, get_current_staff_user
+from app.models.client import Client
 from app.models.grant import Grant, GrantStatus, DeadlineType
 from app.models.lookup import Cause, ApplicantType, Province, EligibilityFlag
-from app.schemas.grant import GrantCreate, GrantUpdate, GrantResponse
+from app.schemas.grant import GrantCreate, GrantUpdate, GrantResponse, SimilarGrantResponse
+from app.schemas.match import CandidateClient
+from app.services.grant_search import apply_grant_filters, apply_grant_search, merge_ids
+from app.services.match_cache import client_index_version
+from app.services.matching import GrantCatalog, eligibility_ids
+from app.services.match_materializer import recompute_grant_matches
+from app.services.similarity import IndexNotReady, grant_similarity, grant_tokens
 
 router = APIRouter()
 
+# Soonest deadline first (undated last), then name; id makes the key unique for cursors
+GRANT_SORT_KEYS = [(Grant.deadline_at, False), (Grant.name, False), (Grant.id, False)]
+
 
 @router.get("/", response_model=List[GrantResponse])
-async def list_grants(
+def list_grants(
+    response: Response,
     status: Optional[GrantStatus] = None,
     province_id: Optional[UUID] = None,
     applicant_type_id: Optional[UUID] = None,
     cause_id: Optional[UUID] = None,
+    province_ids: List[UUID] = Query([]),
+    applicant_type_ids: List[UUID] = Query([]),
+    cause_ids: List[UUID] = Query([]),
+    eligibility_flag_ids: List[UUID] = Query([]),
+    amount_min: Optional[Decimal] = Query(None, ge=0),
+    amount_max: Optional[Decimal] = Query(None, ge=0),
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
     deadline_type: Optional[DeadlineType] = None,
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """List grants with optional filters"""
+    """List grants with optional filters (offset or cursor paging)"""
     query = db.query(Grant)
     
     if status:
@@ -35,32 +56,38 @@ async def list_grants(
     if deadline_type:
         query = query.filter(Grant.deadline_type == deadline_type)
     
+    rank = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Grant.name.ilike(search_term)) |
-            (Grant.description.ilike(search_term)) |
-            (Grant.funder.ilike(search_term))
-        )
-    
-    if province_id:
-        query = query.filter(Grant.provinces.any(Province.id == province_id))
+        query, rank = apply_grant_search(query, search)
     
-    if applicant_type_id:
-        query = query.filter(Grant.applicant_types.any(ApplicantType.id == applicant_type_id))
+    query = apply_grant_filters(
+        query,
+        province_ids=merge_ids(province_ids, province_id),
+        applicant_type_ids=merge_ids(applicant_type_ids, applicant_type_id),
+        cause_ids=merge_ids(cause_ids, cause_id),
+        eligibility_flag_ids=eligibility_flag_ids,
+        amount_min=amount_min,
+        amount_max=amount_max,
+        deadline_from=deadline_from,
+        deadline_to=deadline_to,
+    )
     
-    if cause_id:
-        query = query.filter(Grant.causes.any(Cause.id == cause_id))
+    # Best text matches first when searching (offset paging only)
+    if rank is not None:
+        if cursor:
+            raise HTTPException(status_code=400, detail="Cursor paging is not supported with search")
+        return query.order_by(
+            rank.desc(), Grant.deadline_at.asc().nullslast(), Grant.name
+        ).offset(skip).limit(limit).all()
     
-    grants = query.order_by(Grant.deadline_at.asc().nullslast(), Grant.name).offset(skip).limit(limit).all()
-    return grants
+    return paginate(query, GRANT_SORT_KEYS, response, skip=skip, limit=limit, cursor=cursor)
 
 
 @router.get("/{grant_id}", response_model=GrantResponse)
-async def get_grant(
+def get_grant(
     grant_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get grant by ID"""
     grant = db.query(Grant).filter(Grant.id == grant_id).first()
@@ -69,11 +96,82 @@ async def get_grant(
     return grant
 
 
+@router.get("/{grant_id}/candidate-clients", response_model=List[CandidateClient])
+def get_candidate_clients(
+    grant_id: UUID,
+    limit: int = Query(100, ge=1, le=500),
+    min_score: int = Query(1, ge=0, le=100),
+    fit_level: Optional[str] = Query(None, pattern="^(high|medium|low)$"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff_user)
+):
+    """Rank all clients against one grant, best fit first (does not save)"""
+    grant = db.query(Grant).filter(Grant.id == grant_id).first()
+    if not grant:
+        raise HTTPException(status_code=404, detail="Grant not found")
+    
+    # One pass over the lookup -> clients index instead of scoring each client separately
+    _, index = client_index_version.get(db)
+    eligibility = {category: list(ids) for category, ids in eligibility_ids(grant).items()}
+    top = index.top(eligibility, limit, min_score=min_score, fit_level=fit_level)
+    
+    clients = {}
+    if top:
+        client_ids = [client_id for client_id, _, _ in top]
+        clients = {row.id: row for row in db.query(Client.id, Client.name, Client.client_type).filter(Client.id.in_(client_ids)).all()}
+    
+    # Single-grant catalog gives the same reasons as generate_matches
+    catalog = GrantCatalog([(grant.id, eligibility)])
+    results = []
+    for client_id, score, level in top:
+        if client_id not in clients:  # Deleted since the index was built
+            continue
+        results.append(CandidateClient(
+            client_id=client_id,
+            client_name=clients[client_id].name,
+            client_type=clients[client_id].client_type,
+            fit_score=score,
+            fit_level=level,
+            reasons=catalog.explain(index.profiles[client_id], grant.id)
+        ))
+    
+    return results
+
+
+@router.get("/{grant_id}/similar", response_model=List[SimilarGrantResponse])
+def get_similar_grants(
+    grant_id: UUID,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff_user)
+):
+    """Open grants with the most similar eligibility and description, most similar first"""
+    tokens = grant_tokens(db, [grant_id], open_only=False)
+    if grant_id not in tokens:
+        raise HTTPException(status_code=404, detail="Grant not found")
+    
+    # LSH candidates only, not a scan of every grant
+    try:
+        similar = grant_similarity.query(db, tokens[grant_id], limit, exclude=grant_id)
+    except IndexNotReady:
+        raise HTTPException(status_code=503, detail="Similarity index is still building", headers={"Retry-After": "30"})
+    
+    grants = {}
+    if similar:
+        grants = {g.id: g for g in db.query(Grant).filter(Grant.id.in_([key for key, _ in similar])).all()}
+    
+    return [
+        SimilarGrantResponse(**GrantResponse.model_validate(grants[key]).model_dump(), similarity=round(similarity, 4))
+        for key, similarity in similar
+        if key in grants  # Deleted since the index was refreshed
+    ]
+
+
 @router.post("/", response_model=GrantResponse)
-async def create_grant(
+def create_grant(
     grant_data: GrantCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Create a new grant"""
     grant = Grant(
@@ -117,17 +215,19 @@ async def create_grant(
 
 
 @router.patch("/{grant_id}", response_model=GrantResponse)
-async def update_grant(
+def update_grant(
     grant_id: UUID,
     grant_data: GrantUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Update a grant"""
     grant = db.query(Grant).filter(Grant.id == grant_id).first()
     if not grant:
         raise HTTPException(status_code=404, detail="Grant not found")
     
+    previous_eligibility = eligibility_ids(grant)
     update_data = grant_data.model_dump(exclude_unset=True)
     
     # Handle relationships separately
@@ -154,15 +254,19 @@ async def update_grant(
     db.commit()
     db.refresh(grant)
     
+    # Stored matches for this grant are stale if its eligibility changed
+    if eligibility_ids(grant) != previous_eligibility:
+        background_tasks.add_task(recompute_grant_matches, grant.id)
+    
     return grant
 
 
 @router.post("/{grant_id}/verify", response_model=GrantResponse)
-async def verify_grant(
+def verify_grant(
     grant_id: UUID,
     status: GrantStatus = GrantStatus.open,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Verify a grant and update its status"""
     grant = db.query(Grant).filter(Grant.id == grant_id).first()
@@ -179,10 +283,10 @@ async def verify_grant(
 
 
 @router.delete("/{grant_id}")
-async def delete_grant(
+def delete_grant(
     grant_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Delete a grant"""
     grant = db.query(Grant).filter(Grant.id == grant_id).first()
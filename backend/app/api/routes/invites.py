@@ -4,7 +4,7 @@ from typing import List
 from uuid import UUID
 from datetime import datetime
 from app.core.database import get_db
-from app.core.security import get_current_staff_user, get_password_hash
+from app.core.security import Principal, get_current_staff_user, get_password_hash
 from app.core.config import settings
 from app.models.user import User, UserRole
 from app.models.client import Client, ClientUser
@@ -16,10 +16,10 @@ router = APIRouter()
 
 
 @router.get("/client/{client_id}", response_model=List[InviteResponse])
-async def get_client_invites(
+def get_client_invites(
     client_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Get all pending invites for a client"""
     client = db.query(Client).filter(Client.id == client_id).first()
@@ -34,11 +34,11 @@ async def get_client_invites(
 
 
 @router.post("/client/{client_id}", response_model=InviteResponse)
-async def create_invite(
+def create_invite(
     client_id: UUID,
     invite_data: InviteCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Create and send an invite to a client user"""
     client = db.query(Client).filter(Client.id == client_id).first()
@@ -77,25 +77,28 @@ async def create_invite(
         )
         db.add(invite)
     
-    db.commit()
-    db.refresh(invite)
+    db.flush()
     
-    # Send invite email
+    # Queue invite email in the same transaction as the invite
     send_invite_email(
+        db,
         email=invite.email,
         name=invite.name,
         client_name=client.name,
         invite_token=invite.token
     )
     
+    db.commit()
+    db.refresh(invite)
+    
     return invite
 
 
 @router.post("/{invite_id}/resend", response_model=InviteResponse)
-async def resend_invite(
+def resend_invite(
     invite_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Resend an invite with a new token"""
     invite = db.query(ClientInvite).filter(ClientInvite.id == invite_id).first()
@@ -108,25 +111,26 @@ async def resend_invite(
     invite.token = generate_invite_token()
     invite.expires_at = get_expiry_date()
     
-    db.commit()
-    db.refresh(invite)
-    
-    # Resend email
+    # Queue email with the new token
     send_invite_email(
+        db,
         email=invite.email,
         name=invite.name,
         client_name=client.name,
         invite_token=invite.token
     )
     
+    db.commit()
+    db.refresh(invite)
+    
     return invite
 
 
 @router.delete("/{invite_id}")
-async def delete_invite(
+def delete_invite(
     invite_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Delete/cancel an invite"""
     invite = db.query(ClientInvite).filter(ClientInvite.id == invite_id).first()
@@ -141,7 +145,7 @@ async def delete_invite(
 
 # Public endpoints (no auth required)
 @router.get("/verify/{token}", response_model=InviteInfo)
-async def verify_invite(
+def verify_invite(
     token: str,
     db: Session = Depends(get_db)
 ):
@@ -169,7 +173,7 @@ async def verify_invite(
 
 
 @router.post("/accept")
-async def accept_invite(
+def accept_invite(
     accept_data: InviteAccept,
     db: Session = Depends(get_db)
 ):
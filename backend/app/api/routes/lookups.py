@@ -1,40 +1,41 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Request, Response
 from typing import List
-from app.core.database import get_db
-from app.models.lookup import Cause, ApplicantType, Province, EligibilityFlag
 from app.schemas.lookup import CauseResponse, ApplicantTypeResponse, ProvinceResponse, EligibilityFlagResponse
+from app.services.lookup_cache import lookup_registry
 
 router = APIRouter()
 
 
+def serve_lookup(category: str, request: Request, response: Response):
+    """Serve a lookup table from the in-memory registry, honouring If-None-Match"""
+    etag = lookup_registry.etag(category)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"  # Revalidate with the ETag each time
+    return lookup_registry.active(category)
+
+
 @router.get("/causes", response_model=List[CauseResponse])
-async def list_causes(
-    db: Session = Depends(get_db)
-):
+def list_causes(request: Request, response: Response):
     """Get all active causes"""
-    return db.query(Cause).filter(Cause.is_active == True).order_by(Cause.name).all()
+    return serve_lookup("causes", request, response)
 
 
 @router.get("/applicant-types", response_model=List[ApplicantTypeResponse])
-async def list_applicant_types(
-    db: Session = Depends(get_db)
-):
+def list_applicant_types(request: Request, response: Response):
     """Get all active applicant types"""
-    return db.query(ApplicantType).filter(ApplicantType.is_active == True).order_by(ApplicantType.name).all()
+    return serve_lookup("applicant_types", request, response)
 
 
 @router.get("/provinces", response_model=List[ProvinceResponse])
-async def list_provinces(
-    db: Session = Depends(get_db)
-):
+def list_provinces(request: Request, response: Response):
     """Get all active provinces"""
-    return db.query(Province).filter(Province.is_active == True).order_by(Province.name).all()
+    return serve_lookup("provinces", request, response)
 
 
 @router.get("/eligibility-flags", response_model=List[EligibilityFlagResponse])
-async def list_eligibility_flags(
-    db: Session = Depends(get_db)
-):
+def list_eligibility_flags(request: Request, response: Response):
     """Get all active eligibility flags"""
-    return db.query(EligibilityFlag).filter(EligibilityFlag.is_active == True).order_by(EligibilityFlag.name).all()
+    return serve_lookup("eligibility_flags", request, response)
@@ -4,8 +4,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 from app.core.database import get_db
-from app.core.security import get_current_staff_user
-from app.models.user import User
+from app.core.security import Principal, get_current_staff_user
 from app.models.client import Client
 from app.models.managed_service_request import ManagedServiceRequest
 from app.schemas.client import ManagedServiceRequestResponse
@@ -20,10 +19,10 @@ class ManagedServiceRequestUpdate(BaseModel):
 
 
 @router.get("/", response_model=List[ManagedServiceRequestResponse])
-async def list_managed_service_requests(
+def list_managed_service_requests(
     status: Optional[str] = Query(None, description="Filter by status"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user),
+    current_user: Principal = Depends(get_current_staff_user),
 ):
     """List all managed service / expert help requests (staff only)."""
     query = db.query(ManagedServiceRequest).order_by(ManagedServiceRequest.created_at.desc())
@@ -34,10 +33,10 @@ async def list_managed_service_requests(
 
 
 @router.get("/{request_id}", response_model=ManagedServiceRequestResponse)
-async def get_managed_service_request(
+def get_managed_service_request(
     request_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user),
+    current_user: Principal = Depends(get_current_staff_user),
 ):
     """Get a single request (staff only)."""
     req = db.query(ManagedServiceRequest).filter(ManagedServiceRequest.id == request_id).first()
@@ -47,11 +46,11 @@ async def get_managed_service_request(
 
 
 @router.patch("/{request_id}", response_model=ManagedServiceRequestResponse)
-async def update_managed_service_request(
+def update_managed_service_request(
     request_id: UUID,
     data: ManagedServiceRequestUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user),
+    current_user: Principal = Depends(get_current_staff_user),
 ):
     """Update status or notes (staff only)."""
     req = db.query(ManagedServiceRequest).filter(ManagedServiceRequest.id == request_id).first()
@@ -1,106 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import inspect
+import json
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import and_
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 from uuid import UUID
-from app.core.database import get_db
-from app.core.security import get_current_user, get_current_staff_user
-from app.models.user import User
+from app.core.database import SessionLocal, get_db
+from app.core.pagination import paginate
+from app.core.security import Principal, get_current_staff_user, get_current_admin_user
 from app.models.client import Client
 from app.models.grant import Grant, GrantStatus
 from app.models.match import Match, MatchStatus
-from app.schemas.match import MatchCreate, MatchUpdate, MatchResponse, MatchGenerate
+from app.schemas.match import (
+    MatchCreate, MatchUpdate, MatchResponse, MatchGenerate, MatchGenerateBulk, MatchExplanation,
+    MatchAnalyticsResponse, ScoreBucket, LookupCoverage, ClientWithoutHigh
+)
+from app.services.lookup_cache import lookup_registry
+from app.services.match_analytics import latest_analytics
+from app.services.match_materializer import (
+    finish_scoring, last_rescore_stats, rescore_all, running_scoring_job, start_scoring
+)
+from app.services.match_cache import grant_catalog_version, match_results, profile_fingerprint
+from app.services.matching import (
+    EligibilityProfile, GrantCatalog, compact_named_reasons, explain_fit, fit_score,
+    get_fit_level, load_client_profiles
+)
+from app.services.scoring_pool import top_clients
 
 router = APIRouter()
 
+# Best fit first; id makes the key unique for cursors
+MATCH_SORT_KEYS = [(Match.fit_score, True), (Match.id, False)]
 
-def calculate_fit_score(client: Client, grant: Grant) -> tuple[int, str, dict]:
-    """Calculate fit score between a client and a grant"""
-    score = 0
-    reasons = {
-        "matching_causes": [],
-        "matching_applicant_types": [],
-        "matching_provinces": [],
-        "matching_flags": [],
-        "issues": []
-    }
-    
-    # Check causes (30 points max)
-    client_cause_ids = {c.id for c in client.causes}
-    grant_cause_ids = {c.id for c in grant.causes}
-    matching_causes = client_cause_ids & grant_cause_ids
-    
-    if grant_cause_ids:
-        cause_score = int((len(matching_causes) / len(grant_cause_ids)) * 30)
-        score += cause_score
-        reasons["matching_causes"] = [c.name for c in client.causes if c.id in matching_causes]
-        if not matching_causes:
-            reasons["issues"].append("No matching causes")
-    else:
-        score += 30  # No cause requirement = full points
-    
-    # Check applicant types (30 points max)
-    client_type_ids = {t.id for t in client.applicant_types}
-    grant_type_ids = {t.id for t in grant.applicant_types}
-    matching_types = client_type_ids & grant_type_ids
-    
-    if grant_type_ids:
-        type_score = int((len(matching_types) / len(grant_type_ids)) * 30)
-        score += type_score
-        reasons["matching_applicant_types"] = [t.name for t in client.applicant_types if t.id in matching_types]
-        if not matching_types:
-            reasons["issues"].append("No matching applicant types")
-    else:
-        score += 30
-    
-    # Check provinces (30 points max)
-    client_province_ids = {p.id for p in client.provinces}
-    grant_province_ids = {p.id for p in grant.provinces}
-    matching_provinces = client_province_ids & grant_province_ids
-    
-    if grant_province_ids:
-        province_score = int((len(matching_provinces) / len(grant_province_ids)) * 30)
-        score += province_score
-        reasons["matching_provinces"] = [p.name for p in client.provinces if p.id in matching_provinces]
-        if not matching_provinces:
-            reasons["issues"].append("No matching provinces")
-    else:
-        score += 30  # No province requirement = full points (national grant)
-    
-    # Check eligibility flags (10 points max)
-    client_flag_ids = {f.id for f in client.eligibility_flags}
-    grant_flag_ids = {f.id for f in grant.eligibility_flags}
-    matching_flags = client_flag_ids & grant_flag_ids
-    
-    if grant_flag_ids:
-        flag_score = int((len(matching_flags) / len(grant_flag_ids)) * 10)
-        score += flag_score
-        reasons["matching_flags"] = [f.name for f in client.eligibility_flags if f.id in matching_flags]
-    else:
-        score += 10
-    
-    # Determine fit level
-    if score >= 80:
-        fit_level = "high"
-    elif score >= 50:
-        fit_level = "medium"
-    else:
-        fit_level = "low"
-    
-    return score, fit_level, reasons
+# Saved matches in these statuses are left out of generated recommendations by default
+DEFAULT_EXCLUDED_STATUSES = [MatchStatus.rejected, MatchStatus.converted]
 
 
 @router.get("/", response_model=List[MatchResponse])
-async def list_matches(
+def list_matches(
+    response: Response,
     client_id: Optional[UUID] = None,
     status: Optional[MatchStatus] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
-    """List all matches with optional filters"""
-    query = db.query(Match)
+    """List all matches with optional filters (offset or cursor paging)"""
+    # Grants load in one batch per page, not one query per match (eligibility comes from their id arrays)
+    query = db.query(Match).options(selectinload(Match.grant))
     
     if client_id:
         query = query.filter(Match.client_id == client_id)
@@ -108,15 +59,72 @@ async def list_matches(
     if status:
         query = query.filter(Match.status == status)
     
-    matches = query.order_by(Match.fit_score.desc()).offset(skip).limit(limit).all()
-    return matches
+    return paginate(query, MATCH_SORT_KEYS, response, skip=skip, limit=limit, cursor=cursor)
+
+
+@router.get("/analytics", response_model=MatchAnalyticsResponse)
+def get_match_analytics(
+    category: Optional[str] = Query(None, pattern="^(causes|applicant_types|provinces|eligibility_flags)$"),
+    client_limit: int = Query(50, ge=0, le=500),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff_user)
+):
+    """
+    Fit score histogram, per-lookup coverage and clients without a high-fit
+    grant, as of the last full match batch (read from the summary table)
+    """
+    analytics = latest_analytics(db)
+    if not analytics:
+        raise HTTPException(status_code=404, detail="No analytics yet; run the match batch first")
+    
+    histogram = [
+        ScoreBucket(min_score=index * 10, max_score=min(index * 10 + 9, 100), count=count)
+        for index, count in enumerate(analytics.score_histogram)
+    ]
+    
+    coverage = []
+    for lookup_category, lookups in analytics.coverage.items():
+        if category and lookup_category != category:
+            continue
+        for lookup_id, (clients, grants, without_high) in lookups.items():
+            coverage.append(LookupCoverage(
+                category=lookup_category,
+                lookup_id=lookup_id,
+                name=lookup_registry.name(lookup_category, UUID(lookup_id)),
+                clients=clients,
+                grants=grants,
+                clients_without_high=without_high
+            ))
+    # Least served first
+    coverage.sort(key=lambda item: (item.category, -item.clients_without_high, item.name or ""))
+    
+    sample = []
+    sample_ids = analytics.clients_without_high_ids[:client_limit]
+    if sample_ids:
+        names = dict(db.query(Client.id, Client.name).filter(Client.id.in_(sample_ids)).all())
+        sample = [
+            ClientWithoutHigh(client_id=client_id, client_name=names[UUID(client_id)])
+            for client_id in sample_ids
+            if UUID(client_id) in names  # Deleted since the batch ran
+        ]
+    
+    return MatchAnalyticsResponse(
+        computed_at=analytics.computed_at,
+        clients=analytics.clients,
+        grants=analytics.grants,
+        pairs_scored=analytics.pairs_scored,
+        score_histogram=histogram,
+        coverage=coverage,
+        clients_without_high=analytics.clients_without_high,
+        clients_without_high_sample=sample
+    )
 
 
 @router.get("/{match_id}", response_model=MatchResponse)
-async def get_match(
+def get_match(
     match_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Get match by ID"""
     match = db.query(Match).filter(Match.id == match_id).first()
@@ -125,43 +133,238 @@ async def get_match(
     return match
 
 
+@router.get("/{match_id}/explain", response_model=MatchExplanation)
+def explain_match(
+    match_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff_user)
+):
+    """Explain a match from the current client and grant eligibility"""
+    match = db.query(Match).filter(Match.id == match_id).first()
+    if not match:
+        raise HTTPException(status_code=404, detail="Match not found")
+    
+    score = fit_score(match.client, match.grant)
+    return MatchExplanation(
+        match_id=match.id,
+        fit_score=score,
+        fit_level=get_fit_level(score),
+        reasons=explain_fit(match.client, match.grant)
+    )
+
+
 @router.post("/generate/{client_id}", response_model=List[MatchGenerate])
-async def generate_matches(
+def generate_matches(
     client_id: UUID,
+    limit: int = Query(100, ge=1, le=500),
+    skip: int = Query(0, ge=0),
+    min_score: int = Query(1, ge=0, le=100),
+    fit_level: Optional[str] = Query(None, pattern="^(high|medium|low)$"),
+    exclude_status: List[MatchStatus] = Query(DEFAULT_EXCLUDED_STATUSES),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
-    """Generate match recommendations for a client (does not save)"""
+    """
+    Generate the top match recommendations for a client (does not save).
+    Grants already saved as a match in one of `exclude_status` are skipped;
+    the rest carry the saved match's id and status, if any.
+    """
     client = db.query(Client).filter(Client.id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    # Get all open grants
-    grants = db.query(Grant).filter(Grant.status == GrantStatus.open).all()
+    saved = {
+        grant_id: (match_id, status)
+        for grant_id, match_id, status in db.query(Match.grant_id, Match.id, Match.status).filter(
+            Match.client_id == client_id
+        ).all()
+    }
+    excluded = frozenset(grant_id for grant_id, (_, status) in saved.items() if status in exclude_status)
+    
+    # Score against every open grant on the bitset catalog; only the top `limit` are hydrated.
+    # Clients with the same profile (and exclusions) reuse the ranking until a grant changes.
+    snapshot_key, catalog = grant_catalog_version.get(db)
+    profile = EligibilityProfile.from_client(client)
+    key = ("generate", profile_fingerprint(profile), snapshot_key, limit, skip, min_score, fit_level, excluded)
+    top = match_results.get(key)
+    if top is None:
+        top = catalog.top(
+            profile,
+            limit,
+            min_score=min_score,
+            fit_level=fit_level,
+            skip=skip,
+            exclude=excluded
+        )
+        match_results.set(key, top)
     
-    # Calculate fit scores
-    results = []
-    for grant in grants:
-        score, fit_level, reasons = calculate_fit_score(client, grant)
-        if score > 0:  # Only include grants with some match
-            results.append(MatchGenerate(
-                grant=grant,
-                fit_score=score,
-                fit_level=fit_level,
-                reasons=reasons
-            ))
+    grants = {}
+    if top:
+        grant_ids = [grant_id for grant_id, _, _ in top]
+        grants = {
+            g.id: g for g in db.query(Grant).filter(Grant.id.in_(grant_ids), Grant.status == GrantStatus.open).all()
+        }
     
-    # Sort by score descending
-    results.sort(key=lambda x: x.fit_score, reverse=True)
+    results = []
+    for grant_id, score, level in top:
+        if grant_id not in grants:  # Closed or deleted since the catalog was loaded
+            continue
+        match_id, status = saved.get(grant_id, (None, None))
+        results.append(MatchGenerate(
+            grant=grants[grant_id],
+            fit_score=score,
+            fit_level=level,
+            reasons=catalog.explain(profile, grant_id),
+            match_id=match_id,
+            status=status
+        ))
     
     return results
 
 
+def _stream_bulk_matches(
+    catalog: GrantCatalog,
+    profiles: List,
+    names: Dict[UUID, str],
+    excluded: Dict[UUID, Set[UUID]],
+    request: MatchGenerateBulk
+):
+    """
+    Yield one NDJSON line per client as each shard of clients is scored.
+    The caller has claimed the scoring pool; it is released when this ends.
+    """
+    # The request's session is closed once the route returns, so streaming uses its own
+    db = SessionLocal()
+    shards = top_clients(
+        catalog,
+        profiles,
+        request.limit,
+        min_score=request.min_score,
+        fit_level=request.fit_level,
+        exclude=excluded,
+        start_method="spawn"
+    )
+    try:
+        for shard, tops in shards:
+            # One grant query and one saved-match query per shard, limited to grants in someone's top list
+            grant_ids = {grant_id for _, top in tops for grant_id, _, _ in top}
+            grants = {}
+            saved = {}
+            if grant_ids:
+                grants = {g.id: g for g in db.query(Grant).filter(Grant.id.in_(grant_ids)).all()}
+                saved = {
+                    (client_id, grant_id): (match_id, status)
+                    for client_id, grant_id, match_id, status in db.query(
+                        Match.client_id, Match.grant_id, Match.id, Match.status
+                    ).filter(
+                        Match.client_id.in_([client_id for client_id, _ in shard]),
+                        Match.grant_id.in_(grant_ids)
+                    ).all()
+                }
+            shard_profiles = dict(shard)
+            
+            for client_id, top in tops:
+                matches = []
+                for grant_id, score, level in top:
+                    if grant_id not in grants:  # Closed or deleted since the catalog was loaded
+                        continue
+                    match_id, status = saved.get((client_id, grant_id), (None, None))
+                    matches.append(MatchGenerate(
+                        grant=grants[grant_id],
+                        fit_score=score,
+                        fit_level=level,
+                        reasons=catalog.explain(shard_profiles[client_id], grant_id),
+                        match_id=match_id,
+                        status=status
+                    ).model_dump(mode="json"))
+                yield json.dumps({
+                    "client_id": str(client_id),
+                    "client_name": names[client_id],
+                    "matches": matches
+                }) + "\n"
+            db.rollback()  # Don't hold a transaction open between shards
+    finally:
+        shards.close()  # Cancels unscored shards when the client disconnects
+        db.close()
+        finish_scoring()
+
+
+def _close_stream(stream) -> None:
+    """
+    Runs after the response ends, including on client disconnect. Closing
+    the generator runs its cleanup; one that never started still holds the
+    scoring pool, so release it here.
+    """
+    started = inspect.getgeneratorstate(stream) != inspect.GEN_CREATED
+    stream.close()
+    if not started:
+        finish_scoring()
+
+
+@router.post("/generate")
+def generate_matches_bulk(
+    request: MatchGenerateBulk,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff_user)
+):
+    """
+    Generate top match recommendations for many clients (does not save).
+    Streams NDJSON, one {"client_id", "client_name", "matches"} line per client,
+    in client id order as each shard of clients is scored. Saved matches are
+    excluded and annotated as in the single-client endpoint.
+    """
+    query = db.query(Client.id, Client.name)
+    if request.client_ids is not None:
+        query = query.filter(Client.id.in_(request.client_ids))
+    if request.client_type:
+        query = query.filter(Client.client_type == request.client_type)
+    names = dict(query.all())
+    
+    if request.client_ids is not None:
+        missing = set(request.client_ids) - set(names)
+        if missing and not request.client_type:
+            raise HTTPException(status_code=404, detail=f"{len(missing)} clients not found")
+    
+    # The catalog is loaded (or reused) once and shared by every worker
+    _, catalog = grant_catalog_version.get(db)
+    profiles = load_client_profiles(db, list(names)) if names else []
+    
+    # Pairs already decided are dropped before ranking, in the workers
+    excluded: Dict[UUID, Set[UUID]] = {}
+    if names and request.exclude_status:
+        for client_id, grant_id in db.query(Match.client_id, Match.grant_id).filter(
+            Match.client_id.in_(list(names)),
+            Match.status.in_(request.exclude_status)
+        ).all():
+            excluded.setdefault(client_id, set()).add(grant_id)
+    
+    # One process-pool job at a time per API process (shared with rescore-all)
+    if not start_scoring("bulk generation"):
+        raise HTTPException(status_code=409, detail=f"A {running_scoring_job() or 'scoring job'} is already running")
+    stream = _stream_bulk_matches(catalog, profiles, names, excluded, request)
+    return StreamingResponse(stream, media_type="application/x-ndjson", background=BackgroundTask(_close_stream, stream))
+
+
+@router.post("/rescore-all", status_code=202)
+def rescore_all_matches(
+    background_tasks: BackgroundTasks,
+    workers: Optional[int] = Query(None, ge=1),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """Rescore every client against every open grant in the background (admin only)"""
+    job = running_scoring_job()
+    if job:
+        raise HTTPException(status_code=409, detail=f"A {job} is already running")
+    
+    background_tasks.add_task(rescore_all, workers)
+    return {"status": "started", "last_run": last_rescore_stats()}
+
+
 @router.post("/", response_model=MatchResponse)
-async def create_match(
+def create_match(
     match_data: MatchCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Save a match decision"""
     # Check for existing match
@@ -180,7 +383,7 @@ async def create_match(
         grant_id=match_data.grant_id,
         fit_score=match_data.fit_score,
         fit_level=match_data.fit_level,
-        reasons=match_data.reasons,
+        reasons=compact_named_reasons(match_data.reasons),
         notes=match_data.notes,
         status=match_data.status,
         owner_user_id=match_data.owner_user_id or current_user.id
@@ -194,11 +397,11 @@ async def create_match(
 
 
 @router.patch("/{match_id}", response_model=MatchResponse)
-async def update_match(
+def update_match(
     match_id: UUID,
     match_data: MatchUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Update match status/notes"""
     match = db.query(Match).filter(Match.id == match_id).first()
@@ -216,10 +419,10 @@ async def update_match(
 
 
 @router.delete("/{match_id}")
-async def delete_match(
+def delete_match(
     match_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_staff_user)
+    current_user: Principal = Depends(get_current_staff_user)
 ):
     """Delete a match"""
     match = db.query(Match).filter(Match.id == match_id).first()
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy import desc, func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
+from datetime import date
+from decimal import Decimal
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User, UserRole
-from app.models.client import Client, ClientUser, SavedGrant
+from app.core.pagination import TOTAL_COUNT_HEADER
+from app.core.security import Principal, get_current_user
+from app.models.user import UserRole
+from app.models.client import Client, SavedGrant
 from app.models.managed_service_request import ManagedServiceRequest
 from app.models.application import Application, ApplicationEvent
 from app.models.grant import Grant, GrantStatus, DeadlineType
@@ -15,21 +19,26 @@ from app.schemas.client import (
     ManagedServiceRequestCreate, ManagedServiceRequestResponse,
 )
 from app.schemas.application import ApplicationResponse, ApplicationEventResponse
-from app.schemas.grant import GrantResponse
+from app.schemas.grant import GrantMatchPreview, GrantResponse, ScoredGrantResponse
+from app.services.grant_search import apply_grant_filters, apply_grant_search, merge_ids
+from app.services.lookup_cache import lookup_registry
+from app.services.match_cache import grant_catalog_version, match_results, profile_fingerprint
+from app.services.matching import EligibilityProfile, eligibility_ids, get_fit_level, scored_grant_query
+from app.services.match_materializer import recompute_client_matches
 
 router = APIRouter()
 
 
-def get_client_for_user(user: User, db: Session) -> Client:
+def get_client_for_user(user: Principal, db: Session) -> Client:
     """Get the client organization linked to a client user"""
     if user.role != UserRole.client:
         raise HTTPException(status_code=403, detail="Not a client user")
     
-    client_user = db.query(ClientUser).filter(ClientUser.user_id == user.id).first()
-    if not client_user:
+    # Memberships come with the cached principal, so only the client itself is queried
+    if not user.client_ids:
         raise HTTPException(status_code=404, detail="No client organization linked to this user")
     
-    client = db.query(Client).filter(Client.id == client_user.client_id).first()
+    client = db.query(Client).filter(Client.id == user.client_ids[0]).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client organization not found")
     
@@ -46,18 +55,18 @@ def require_grant_db_access(client: Client) -> None:
 
 
 @router.get("/my-client", response_model=ClientResponse)
-async def get_my_client(
+def get_my_client(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get the client organization for the logged-in client user"""
     return get_client_for_user(current_user, db)
 
 
 @router.get("/applications", response_model=List[ApplicationResponse])
-async def get_my_applications(
+def get_my_applications(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get all applications for the client's organization"""
     client = get_client_for_user(current_user, db)
@@ -70,10 +79,10 @@ async def get_my_applications(
 
 
 @router.get("/applications/{application_id}", response_model=ApplicationResponse)
-async def get_application(
+def get_application(
     application_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get a specific application (must belong to user's client org)"""
     client = get_client_for_user(current_user, db)
@@ -90,10 +99,10 @@ async def get_application(
 
 
 @router.get("/applications/{application_id}/events", response_model=List[ApplicationEventResponse])
-async def get_application_events(
+def get_application_events(
     application_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get events for a specific application (must belong to user's client org)"""
     client = get_client_for_user(current_user, db)
@@ -117,17 +126,25 @@ async def get_application_events(
 # ==================== GRANT DATABASE (Subscription Required) ====================
 
 @router.get("/grants", response_model=List[GrantResponse])
-async def list_grants_for_client(
+def list_grants_for_client(
     status: Optional[GrantStatus] = None,
     province_id: Optional[UUID] = None,
     applicant_type_id: Optional[UUID] = None,
     cause_id: Optional[UUID] = None,
+    province_ids: List[UUID] = Query([]),
+    applicant_type_ids: List[UUID] = Query([]),
+    cause_ids: List[UUID] = Query([]),
+    eligibility_flag_ids: List[UUID] = Query([]),
+    amount_min: Optional[Decimal] = Query(None, ge=0),
+    amount_max: Optional[Decimal] = Query(None, ge=0),
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
     deadline_type: Optional[DeadlineType] = None,
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     List grants with optional filters.
@@ -147,74 +164,129 @@ async def list_grants_for_client(
     if deadline_type:
         query = query.filter(Grant.deadline_type == deadline_type)
     
+    rank = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Grant.name.ilike(search_term)) |
-            (Grant.description.ilike(search_term)) |
-            (Grant.funder.ilike(search_term))
-        )
-    
-    if province_id:
-        query = query.filter(Grant.provinces.any(Province.id == province_id))
-    
-    if applicant_type_id:
-        query = query.filter(Grant.applicant_types.any(ApplicantType.id == applicant_type_id))
+        query, rank = apply_grant_search(query, search)
+    
+    query = apply_grant_filters(
+        query,
+        province_ids=merge_ids(province_ids, province_id),
+        applicant_type_ids=merge_ids(applicant_type_ids, applicant_type_id),
+        cause_ids=merge_ids(cause_ids, cause_id),
+        eligibility_flag_ids=eligibility_flag_ids,
+        amount_min=amount_min,
+        amount_max=amount_max,
+        deadline_from=deadline_from,
+        deadline_to=deadline_to,
+    )
     
-    if cause_id:
-        query = query.filter(Grant.causes.any(Cause.id == cause_id))
+    # Best text matches first when searching, otherwise soonest deadline
+    order_by = [Grant.deadline_at.asc().nullslast(), Grant.name]
+    if rank is not None:
+        order_by.insert(0, rank.desc())
     
-    grants = query.order_by(Grant.deadline_at.asc().nullslast(), Grant.name).offset(skip).limit(limit).all()
+    grants = query.order_by(*order_by).offset(skip).limit(limit).all()
     return grants
 
 
-@router.get("/grants/matches", response_model=List[GrantResponse])
-async def find_matching_grants(
+@router.get("/grants/matches", response_model=List[ScoredGrantResponse])
+def find_matching_grants(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    Find grants that match the client's eligibility profile.
+    Find grants that match the client's eligibility profile, best fit first.
     REQUIRES SUBSCRIPTION - client must have grant_db_access.
     """
     client = get_client_for_user(current_user, db)
     require_grant_db_access(client)
     
-    # Get client's eligibility criteria
-    client_cause_ids = [c.id for c in client.causes]
-    client_type_ids = [t.id for t in client.applicant_types]
-    client_province_ids = [p.id for p in client.provinces]
-    
-    # Build query - grants that match at least one criterion in each category
-    query = db.query(Grant).filter(Grant.status == GrantStatus.open)
-    
-    # Match by cause (if client has causes specified)
-    if client_cause_ids:
-        query = query.filter(
-            Grant.causes.any(Cause.id.in_(client_cause_ids))
-        )
+    # Organizations with the same profile get the same page until a grant or lookup changes
+    profile = EligibilityProfile.from_client(client)
+    key = (
+        "portal", profile_fingerprint(profile), grant_catalog_version.version,
+        lookup_registry.current_version(), skip, limit
+    )
+    cached = match_results.get(key)
+    if cached is not None:
+        results, total = cached
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+        return results
+    
+    # Scored, filtered, counted and paged in one query
+    query = scored_grant_query(db, profile)
+    rows = query.add_columns(func.count().over().label("total")).order_by(
+        desc("fit_score"), Grant.deadline_at.asc().nullslast(), Grant.name, Grant.id
+    ).offset(skip).limit(limit).all()
+    
+    if rows:
+        total = rows[0].total
+    else:
+        total = query.count() if skip else 0  # Paged past the end
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
     
-    # Match by applicant type (if client has types specified)
-    if client_type_ids:
-        query = query.filter(
-            Grant.applicant_types.any(ApplicantType.id.in_(client_type_ids))
-        )
+    results = []
+    for grant, fit_score, _ in rows:
+        results.append(ScoredGrantResponse(
+            **GrantResponse.model_validate(grant).model_dump(),
+            fit_score=fit_score,
+            fit_level=get_fit_level(fit_score)
+        ))
     
-    # Match by province (if client has provinces specified)
-    if client_province_ids:
-        query = query.filter(
-            Grant.provinces.any(Province.id.in_(client_province_ids))
-        )
+    match_results.set(key, (results, total))
+    return results
+
+
+@router.post("/grants/matches/preview", response_model=GrantMatchPreview)
+def preview_matching_grants(
+    eligibility: ClientEligibility,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Score a hypothetical eligibility profile against open grants without saving it.
+    Same filtering and scores as /grants/matches. REQUIRES SUBSCRIPTION.
+    """
+    client = get_client_for_user(current_user, db)
+    require_grant_db_access(client)
     
-    grants = query.order_by(Grant.deadline_at.asc().nullslast(), Grant.name).all()
-    return grants
+    # In-memory catalog snapshot; nothing is written and no scoring query runs
+    _, catalog = grant_catalog_version.get(db)
+    profile = EligibilityProfile({
+        "causes": eligibility.cause_ids,
+        "applicant_types": eligibility.applicant_type_ids,
+        "provinces": eligibility.province_ids,
+        "eligibility_flags": eligibility.eligibility_flag_ids,
+    })
+    counts = catalog.fit_level_counts(profile, min_score=0, require_overlap=True)
+    top = catalog.top(profile, limit, min_score=0, require_overlap=True)
+    
+    grants = {}
+    if top:
+        grants = {g.id: g for g in db.query(Grant).filter(Grant.id.in_([grant_id for grant_id, _, _ in top])).all()}
+    
+    results = []
+    for grant_id, score, level in top:
+        if grant_id not in grants:  # Deleted since the catalog was loaded
+            continue
+        results.append(ScoredGrantResponse(
+            **GrantResponse.model_validate(grants[grant_id]).model_dump(),
+            fit_score=score,
+            fit_level=level
+        ))
+    
+    return GrantMatchPreview(total=sum(counts.values()), counts=counts, results=results)
 
 
 @router.get("/grants/{grant_id}", response_model=GrantResponse)
-async def get_grant_for_client(
+def get_grant_for_client(
     grant_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get grant details by ID.
@@ -233,9 +305,9 @@ async def get_grant_for_client(
 # ==================== SAVED GRANTS (Self-Service Feature) ====================
 
 @router.get("/saved-grants", response_model=List[SavedGrantResponse])
-async def get_saved_grants(
+def get_saved_grants(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get all saved/bookmarked grants for the client"""
     client = get_client_for_user(current_user, db)
@@ -248,9 +320,9 @@ async def get_saved_grants(
 
 
 @router.get("/saved-grants/with-details")
-async def get_saved_grants_with_details(
+def get_saved_grants_with_details(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get saved grants with full grant details"""
     client = get_client_for_user(current_user, db)
@@ -274,10 +346,10 @@ async def get_saved_grants_with_details(
 
 
 @router.post("/saved-grants", response_model=SavedGrantResponse)
-async def save_grant(
+def save_grant(
     data: SavedGrantCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Save/bookmark a grant"""
     client = get_client_for_user(current_user, db)
@@ -310,11 +382,11 @@ async def save_grant(
 
 
 @router.patch("/saved-grants/{saved_id}", response_model=SavedGrantResponse)
-async def update_saved_grant(
+def update_saved_grant(
     saved_id: UUID,
     data: SavedGrantUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update notes on a saved grant"""
     client = get_client_for_user(current_user, db)
@@ -337,10 +409,10 @@ async def update_saved_grant(
 
 
 @router.delete("/saved-grants/{saved_id}")
-async def remove_saved_grant(
+def remove_saved_grant(
     saved_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Remove a saved grant"""
     client = get_client_for_user(current_user, db)
@@ -360,10 +432,10 @@ async def remove_saved_grant(
 
 
 @router.delete("/saved-grants/by-grant/{grant_id}")
-async def remove_saved_grant_by_grant_id(
+def remove_saved_grant_by_grant_id(
     grant_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Remove a saved grant by grant ID"""
     client = get_client_for_user(current_user, db)
@@ -385,14 +457,17 @@ async def remove_saved_grant_by_grant_id(
 # ==================== PROFILE (Self-Service Feature) ====================
 
 @router.patch("/profile/eligibility", response_model=ClientResponse)
-async def update_my_eligibility(
+def update_my_eligibility(
     eligibility: ClientEligibility,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update my organization's eligibility profile (for self-service users)"""
     client = get_client_for_user(current_user, db)
     
+    previous_eligibility = eligibility_ids(client)
+    
     # Update eligibility criteria
     client.causes = db.query(Cause).filter(Cause.id.in_(eligibility.cause_ids)).all()
     client.applicant_types = db.query(ApplicantType).filter(ApplicantType.id.in_(eligibility.applicant_type_ids)).all()
@@ -402,15 +477,19 @@ async def update_my_eligibility(
     db.commit()
     db.refresh(client)
     
+    # Stored matches for this client are stale if its profile changed
+    if eligibility_ids(client) != previous_eligibility:
+        background_tasks.add_task(recompute_client_matches, client.id)
+    
     return client
 
 
 @router.patch("/profile", response_model=ClientResponse)
-async def update_my_profile(
+def update_my_profile(
     name: Optional[str] = None,
     entity_type: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update my organization's basic info (for self-service users)"""
     client = get_client_for_user(current_user, db)
@@ -429,10 +508,10 @@ async def update_my_profile(
 # ==================== GET EXPERT HELP (Self-Service Only) ====================
 
 @router.post("/request-managed-service", response_model=ManagedServiceRequestResponse)
-async def request_managed_service(
+def request_managed_service(
     data: ManagedServiceRequestCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Self-service user requests expert/managed help.
@@ -457,9 +536,9 @@ async def request_managed_service(
 
 
 @router.get("/request-managed-service/status")
-async def get_my_managed_service_requests(
+def get_my_managed_service_requests(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get my submitted requests (self-service only)"""
     client = get_client_for_user(current_user, db)
@@ -475,9 +554,9 @@ async def get_my_managed_service_requests(
 # ==================== DASHBOARD STATS ====================
 
 @router.get("/stats")
-async def get_portal_stats(
+def get_portal_stats(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get dashboard stats based on client type"""
     client = get_client_for_user(current_user, db)
@@ -489,18 +568,8 @@ async def get_portal_stats(
         # Matching grants count (if has access)
         matching_count = 0
         if client.grant_db_access:
-            client_cause_ids = [c.id for c in client.causes]
-            client_type_ids = [t.id for t in client.applicant_types]
-            client_province_ids = [p.id for p in client.provinces]
-            
-            query = db.query(Grant).filter(Grant.status == GrantStatus.open)
-            if client_cause_ids:
-                query = query.filter(Grant.causes.any(Cause.id.in_(client_cause_ids)))
-            if client_type_ids:
-                query = query.filter(Grant.applicant_types.any(ApplicantType.id.in_(client_type_ids)))
-            if client_province_ids:
-                query = query.filter(Grant.provinces.any(Province.id.in_(client_province_ids)))
-            matching_count = query.count()
+            # Same query as /grants/matches
+            matching_count = scored_grant_query(db, EligibilityProfile.from_client(client)).count()
         
         # New grants this week
         from datetime import timedelta
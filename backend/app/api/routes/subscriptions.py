@@ -2,14 +2,15 @@
 Subscription/Payment API routes
 """
 from fastapi import APIRouter, Depends, HTTPException, Request, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.core.database import get_db
 from app.core.config import settings
-from app.core.security import get_current_user
-from app.models.user import User, UserRole
-from app.models.client import Client, ClientUser
+from app.core.security import Principal, get_current_user
+from app.models.user import UserRole
+from app.models.client import Client
 from app.schemas.subscription import (
     CheckoutRequest,
     CheckoutResponse,
@@ -24,16 +25,16 @@ from app.services import stripe_service
 router = APIRouter(prefix="/subscriptions", tags=["subscriptions"])
 
 
-def get_client_for_user(user: User, db: Session) -> Client:
+def get_client_for_user(user: Principal, db: Session) -> Client:
     """Get the client organization linked to a client user"""
     if user.role != UserRole.client:
         raise HTTPException(status_code=403, detail="Not a client user")
     
-    client_user = db.query(ClientUser).filter(ClientUser.user_id == user.id).first()
-    if not client_user:
+    # Memberships come with the cached principal, so only the client itself is queried
+    if not user.client_ids:
         raise HTTPException(status_code=404, detail="No client organization linked to this user")
     
-    client = db.query(Client).filter(Client.id == client_user.client_id).first()
+    client = db.query(Client).filter(Client.id == user.client_ids[0]).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client organization not found")
     
@@ -41,7 +42,7 @@ def get_client_for_user(user: User, db: Session) -> Client:
 
 
 @router.get("/prices", response_model=PricesResponse)
-async def get_prices():
+def get_prices():
     """Get available subscription prices"""
     prices = stripe_service.get_price_info()
     
@@ -57,9 +58,9 @@ async def get_prices():
 
 
 @router.get("/status", response_model=SubscriptionStatusResponse)
-async def get_subscription_status(
+def get_subscription_status(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get current subscription status for the logged-in client user"""
     client = get_client_for_user(current_user, db)
@@ -78,10 +79,10 @@ async def get_subscription_status(
 
 
 @router.post("/checkout", response_model=CheckoutResponse)
-async def create_checkout_session(
+def create_checkout_session(
     request: CheckoutRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create a Stripe Checkout session for subscription"""
     client = get_client_for_user(current_user, db)
@@ -112,10 +113,10 @@ async def create_checkout_session(
 
 
 @router.post("/portal", response_model=BillingPortalResponse)
-async def create_billing_portal_session(
+def create_billing_portal_session(
     request: BillingPortalRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create a Stripe Billing Portal session for managing subscription"""
     client = get_client_for_user(current_user, db)
@@ -142,7 +143,7 @@ async def stripe_webhook(
     db: Session = Depends(get_db)
 ):
     """
-    Handle Stripe webhook events.
+    Receive Stripe webhook events (applied asynchronously by app.services.stripe_worker).
     This endpoint is PUBLIC (no auth) - security is via signature verification.
     """
     if not stripe_signature:
@@ -156,23 +157,10 @@ async def stripe_webhook(
         raise HTTPException(status_code=400, detail=str(e))
     
     event_type = event.get("type")
-    event_data = event.get("data", {}).get("object", {})
     
-    # Handle different event types
-    if event_type == "checkout.session.completed":
-        stripe_service.handle_checkout_completed(event_data, db)
-    
-    elif event_type == "customer.subscription.updated":
-        stripe_service.handle_subscription_updated(event_data, db)
-    
-    elif event_type == "customer.subscription.deleted":
-        stripe_service.handle_subscription_deleted(event_data, db)
-    
-    elif event_type == "invoice.payment_failed":
-        stripe_service.handle_invoice_payment_failed(event_data, db)
-    
-    elif event_type == "invoice.paid":
-        stripe_service.handle_invoice_paid(event_data, db)
+    # Store the event and acknowledge; the Stripe worker applies it.
+    # Redeliveries of an event id already stored are ignored.
+    stored = await run_in_threadpool(stripe_service.record_webhook_event, event, db)
     
     # Return 200 to acknowledge receipt (required by Stripe)
-    return {"status": "received", "type": event_type}
+    return {"status": "received" if stored else "duplicate", "type": event_type}
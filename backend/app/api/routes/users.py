@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 from app.core.database import get_db
-from app.core.security import get_current_user, get_current_admin_user, get_password_hash
+from app.core.security import Principal, get_current_user, get_current_admin_user, get_password_hash, invalidate_principal
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
 
@@ -11,19 +11,19 @@ router = APIRouter()
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+def get_current_user_info(
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get current user info"""
     return current_user
 
 
 @router.get("/", response_model=List[UserResponse])
-async def list_users(
+def list_users(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """List all users (admin only)"""
     users = db.query(User).offset(skip).limit(limit).all()
@@ -31,10 +31,10 @@ async def list_users(
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(
+def get_user(
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Get user by ID (admin only)"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -44,10 +44,10 @@ async def get_user(
 
 
 @router.post("/", response_model=UserResponse)
-async def create_user(
+def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Create a new user (admin only)"""
     existing = db.query(User).filter(User.email == user_data.email).first()
@@ -72,11 +72,11 @@ async def create_user(
 
 
 @router.patch("/{user_id}", response_model=UserResponse)
-async def update_user(
+def update_user(
     user_id: UUID,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update user (admin only)"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -89,15 +89,16 @@ async def update_user(
     
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.id)  # Role / active flag may have changed
     
     return user
 
 
 @router.delete("/{user_id}")
-async def delete_user(
+def delete_user(
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Delete user (admin only)"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -106,5 +107,6 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
     
     return {"message": "User deleted"}
@@ -1,13 +1,14 @@
-from sqlalchemy import create_engine
+from typing import Callable, Hashable, Optional
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -16,9 +17,43 @@ Base = declarative_base()
 
 
 def get_db():
-    """Dependency for getting database session"""
+    """
+    Dependency for getting database session.
+    Routes using it are plain `def` so FastAPI runs them in its threadpool
+    and blocking queries never stall the event loop.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# Session.info key for callbacks waiting on the current transaction
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+def run_after_commit(session: Optional[Session], key: Hashable, callback: Callable[[], None]) -> None:
+    """
+    Run `callback` once `session`'s transaction commits, or drop it on rollback.
+    Mapper events fire at flush, before other connections can see the rows, so
+    cache invalidation hooks defer through this. Callbacks registered under the
+    same key in one transaction run once. Without a session it runs immediately.
+    """
+    if session is None:
+        callback()
+        return
+    session.info.setdefault(_AFTER_COMMIT, {})[key] = callback
+
+
+def _run_pending(session: Session) -> None:
+    for callback in session.info.pop(_AFTER_COMMIT, {}).values():
+        callback()
+
+
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_AFTER_COMMIT, None)
+
+
+event.listen(Session, "after_commit", _run_pending)
+event.listen(Session, "after_rollback", _discard_pending)
@@ -0,0 +1,166 @@
+"""
+Keyset (cursor) pagination.
+
+List endpoints keep `skip`/`limit` offset paging for backward compatibility.
+When a page is full they also return an opaque cursor in the X-Next-Cursor
+header; passing it back as `cursor` continues after the last row using the
+endpoint's sort key instead of an OFFSET, so each page is an index range
+scan (given an index matching the sort key) and rows don't shift between
+pages when data changes.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, false, tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# (column, descending). Ascending keys sort NULLS LAST and descending keys
+# NULLS FIRST (the Postgres defaults). The last key must be unique, e.g. id.
+SortKey = Tuple[Any, bool]
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _from_json(column, value: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type in (datetime, date, UUID, str) and not isinstance(value, str):
+        raise ValueError("cursor value has the wrong type")
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+        raise ValueError("cursor value has the wrong type")
+    return python_type(value)
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps([_to_json(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_keys: List[SortKey]) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(sort_keys):
+            raise ValueError("cursor does not match sort key")
+        return [_from_json(column, value) for (column, _), value in zip(sort_keys, values)]
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def order_by_keys(sort_keys: List[SortKey]) -> list:
+    return [column.desc().nullsfirst() if descending else column.asc().nullslast() for column, descending in sort_keys]
+
+
+def _nullable(column) -> bool:
+    return column.expression.nullable
+
+
+def _splits_null_tail(sort_keys: List[SortKey], values: List[Any]) -> bool:
+    """
+    True when the rows after `values` are the rest of a non-NULL range followed
+    by every row whose ascending (NULLS LAST) leading key is NULL
+    """
+    column, descending = sort_keys[0]
+    return not descending and _nullable(column) and values[0] is not None
+
+
+def keyset_filter(sort_keys: List[SortKey], values: List[Any], null_tail: bool = True):
+    """
+    WHERE clause selecting rows that sort strictly after `values`. When every
+    key sorts the same way and nothing past the leading key can be NULL it is
+    a row-value comparison, (a, b) > (:a, :b), which Postgres scans as one
+    index range. Otherwise it is an OR of per-key terms, bounded on the leading
+    key where possible so the index can still seek. null_tail=False leaves out
+    the NULL rows of a nullable ascending leading key (see paginate).
+    """
+    leading, descending = sort_keys[0]
+    if values[0] is None and not descending and len(sort_keys) > 1:
+        # Inside the NULLS LAST tail: only later NULL rows follow, ordered by the remaining keys
+        return and_(leading.is_(None), keyset_filter(sort_keys[1:], values[1:]))
+    if (
+        None not in values
+        and len({key_descending for _, key_descending in sort_keys}) == 1
+        and not any(_nullable(column) for column, _ in sort_keys[1:])
+    ):
+        columns = [column for column, _ in sort_keys]
+        row, cursor_row = (tuple_(*columns), tuple_(*values)) if len(columns) > 1 else (columns[0], values[0])
+        after = row < cursor_row if descending else row > cursor_row
+        if null_tail and _splits_null_tail(sort_keys, values):
+            after = or_(after, leading.is_(None))
+        return after
+
+    terms = []
+    for position, ((column, key_descending), value) in enumerate(zip(sort_keys, values)):
+        if key_descending:
+            after = column.is_not(None) if value is None else column < value
+        else:
+            if value is None:
+                after = None  # Nothing sorts after NULL when NULLS LAST
+            else:
+                after = column > value
+                if _nullable(column) and (position > 0 or null_tail):
+                    after = or_(after, column.is_(None))
+
+        if after is not None:
+            equal = [
+                prev_column.is_(None) if prev_value is None else prev_column == prev_value
+                for (prev_column, _), prev_value in zip(sort_keys[:position], values[:position])
+            ]
+            terms.append(and_(*equal, after))
+
+    if not terms:
+        return false()
+    condition = or_(*terms)
+    # Redundant range on the leading key (nothing after the cursor lies outside it)
+    if values[0] is not None and (descending or not null_tail or not _nullable(leading)):
+        condition = and_(leading <= values[0] if descending else leading >= values[0], condition)
+    return condition
+
+
+def paginate(
+    query: Query,
+    sort_keys: List[SortKey],
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> list:
+    """Order, page (by cursor if given, else offset) and set the next-cursor header"""
+    ordered = query.order_by(*order_by_keys(sort_keys))
+    if not cursor:
+        rows = ordered.offset(skip).limit(limit).all()
+    else:
+        values = decode_cursor(cursor, sort_keys)
+        if not _splits_null_tail(sort_keys, values):
+            rows = ordered.filter(keyset_filter(sort_keys, values)).limit(limit).all()
+        else:
+            # Rest of the non-NULL range, then the NULL tail: two index range scans
+            # rather than one OR that the planner can only answer by sorting
+            rows = ordered.filter(keyset_filter(sort_keys, values, null_tail=False)).limit(limit).all()
+            if len(rows) < limit:
+                rows += ordered.filter(sort_keys[0][0].is_(None)).limit(limit - len(rows)).all()
+
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column, _ in sort_keys])
+
+    return rows
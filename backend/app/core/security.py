@@ -1,16 +1,23 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from uuid import UUID
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.database import get_db
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Resolved principals keyed by token subject. Entries are dropped when the user
+# or their client memberships change in this process; the TTL bounds how long
+# other processes can serve a stale entry.
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -43,13 +50,51 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    """Get current authenticated user from token"""
+class Principal:
+    """Detached snapshot of an authenticated user and their client memberships"""
+    
+    def __init__(self, user, client_ids: Tuple[UUID, ...]):
+        self.id = user.id
+        self.email = user.email
+        self.name = user.name
+        self.role = user.role
+        self.is_active = user.is_active
+        self.created_at = user.created_at
+        self.updated_at = user.updated_at
+        self.client_ids = client_ids
+    
+    def __repr__(self):
+        return f"<Principal {self.email}>"
+
+
+def invalidate_principal(user_id) -> None:
+    """Drop a user's cached principal (call after changing the user or their memberships)"""
+    principal_cache.delete(str(user_id))
+
+
+def load_principal(user_id: str, db: Session) -> Optional[Principal]:
+    """Load a user and their client memberships from the database"""
     from app.models.user import User
+    from app.models.client import ClientUser
     
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        return None
+    
+    client_ids = tuple(
+        row[0] for row in db.query(ClientUser.client_id).filter(ClientUser.user_id == user.id).all()
+    )
+    return Principal(user, client_ids)
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Get current authenticated user from token.
+    Served from the principal cache when possible (no queries on a hit).
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -64,20 +109,23 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = load_principal(user_id, db)
+        if principal is None:
+            raise credentials_exception
+        principal_cache.set(user_id, principal)
     
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Inactive user"
         )
     
-    return user
+    return principal
 
 
-async def get_current_staff_user(current_user = Depends(get_current_user)):
+async def get_current_staff_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """Require staff or admin role"""
     if current_user.role not in ["staff", "admin"]:
         raise HTTPException(
@@ -87,7 +135,7 @@ async def get_current_staff_user(current_user = Depends(get_current_user)):
     return current_user
 
 
-async def get_current_admin_user(current_user = Depends(get_current_user)):
+async def get_current_admin_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """Require admin role"""
     if current_user.role != "admin":
         raise HTTPException(
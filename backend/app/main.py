@@ -1,7 +1,12 @@
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
 from app.api.routes import api_router
+from app.core.database import SessionLocal
+from app.services.lookup_cache import lookup_registry
+from app.services.similarity import client_similarity, grant_similarity
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -18,8 +23,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, "ETag"],
 )
 
+
+@app.on_event("startup")
+async def size_threadpool():
+    """Match the sync route threadpool to the DB pool so throughput scales with it"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+
+@app.on_event("startup")
+def load_lookup_cache():
+    """Warm the lookup registry (it loads lazily on first use if this fails)"""
+    db = SessionLocal()
+    try:
+        lookup_registry.load(db)
+    except Exception as e:
+        print(f"[LOOKUP CACHE] Startup load skipped: {e}")
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def start_similarity_indexes():
+    """Build the similar grants/clients indexes in the background (the endpoints return 503 until ready)"""
+    grant_similarity.start()
+    client_similarity.start()
+
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
@@ -10,6 +10,9 @@ from app.models.match import Match
 from app.models.application import Application, ApplicationEvent
 from app.models.message import Message
 from app.models.managed_service_request import ManagedServiceRequest
+from app.models.email_outbox import EmailOutbox
+from app.models.stripe_event import StripeEvent
+from app.models.match_analytics import MatchAnalytics
 
 __all__ = [
     "User",
@@ -22,4 +25,7 @@ __all__ = [
     "Application", "ApplicationEvent",
     "Message",
     "ManagedServiceRequest",
+    "EmailOutbox",
+    "StripeEvent",
+    "MatchAnalytics",
 ]
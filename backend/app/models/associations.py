@@ -59,3 +59,12 @@ client_eligibility_flags = Table(
     Column("client_id", UUID(as_uuid=True), ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True),
     Column("flag_id", UUID(as_uuid=True), ForeignKey("eligibility_flags.id"), primary_key=True)
 )
+
+# Denormalized uuid[] column on grants / clients mirroring each category's association
+# table, kept in sync by triggers (migration 011) and GIN indexed for && / @> filters
+ELIGIBILITY_ID_ARRAYS = {
+    "causes": "cause_ids",
+    "applicant_types": "applicant_type_ids",
+    "provinces": "province_ids",
+    "eligibility_flags": "eligibility_flag_ids",
+}
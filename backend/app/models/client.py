@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Boolean
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from app.models.associations import client_causes, client_applicant_types, client_provinces, client_eligibility_flags
@@ -21,12 +21,18 @@ class Client(Base):
     
     # Subscription fields for grant database access
     stripe_customer_id = Column(String, nullable=True)
-    subscription_id = Column(String, nullable=True)
+    subscription_id = Column(String, nullable=True, index=True)
     subscription_status = Column(String, nullable=True)  # active, canceled, past_due
     subscription_price_id = Column(String, nullable=True)
     current_period_end = Column(DateTime, nullable=True)
     grant_db_access = Column(Boolean, default=False)  # Manual override by staff
     
+    # Eligibility lookup ids, written only by triggers on the association tables (GIN indexed)
+    cause_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")
+    applicant_type_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")
+    province_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")
+    eligibility_flag_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")
+    
     # Relationships
     users = relationship("ClientUser", back_populates="client")
     matches = relationship("Match", back_populates="client")
@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, Date, Numeric, ForeignKey, Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, DateTime, Date, Numeric, ForeignKey, Computed, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import ARRAY, NUMRANGE, UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 import enum
 from app.core.database import Base
 from app.models.associations import grant_causes, grant_applicant_types, grant_provinces, grant_eligibility_flags
@@ -20,6 +20,21 @@ class DeadlineType(str, enum.Enum):
     multiple = "multiple"
 
 
+# Weighted search document: name > funder > description
+GRANT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(funder, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+# Inclusive funding range; a missing bound is open-ended, and a grant with neither
+# amount gets NULL so amount filters skip it. An inverted pair collapses to amount_min
+GRANT_AMOUNT_RANGE = (
+    "CASE WHEN amount_min IS NULL AND amount_max IS NULL THEN NULL "
+    "ELSE numrange(amount_min, CASE WHEN amount_max < amount_min THEN amount_min ELSE amount_max END, '[]') END"
+)
+
+
 class Grant(Base):
     """External grant opportunity"""
     __tablename__ = "grants"
@@ -44,6 +59,17 @@ class Grant(Base):
     amount_min = Column(Numeric(12, 2))
     amount_max = Column(Numeric(12, 2))
     currency = Column(String(3), nullable=False, default="CAD")
+    # Generated from the two amounts for overlap filters (GiST indexed; deferred like search_vector)
+    amount_range = deferred(Column(NUMRANGE, Computed(GRANT_AMOUNT_RANGE, persisted=True)))
+    
+    # Eligibility lookup ids, written only by triggers on the association tables (GIN indexed)
+    cause_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")
+    applicant_type_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")
+    province_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")
+    eligibility_flag_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")
+    
+    # Full-text search (generated by Postgres, GIN indexed; deferred so normal loads skip it)
+    search_vector = deferred(Column(TSVECTOR, Computed(GRANT_SEARCH_VECTOR, persisted=True)))
     
     # Audit
     created_by_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
@@ -55,11 +81,12 @@ class Grant(Base):
     matches = relationship("Match", back_populates="grant")
     applications = relationship("Application", back_populates="grant")
     
-    # Eligibility criteria (many-to-many)
-    causes = relationship("Cause", secondary=grant_causes, lazy="selectin")
-    applicant_types = relationship("ApplicantType", secondary=grant_applicant_types, lazy="selectin")
-    provinces = relationship("Province", secondary=grant_provinces, lazy="selectin")
-    eligibility_flags = relationship("EligibilityFlag", secondary=grant_eligibility_flags, lazy="selectin")
+    # Eligibility criteria (many-to-many). Loaded only when touched: reads and
+    # responses use the id arrays above (GrantResponse resolves them via the lookup cache)
+    causes = relationship("Cause", secondary=grant_causes)
+    applicant_types = relationship("ApplicantType", secondary=grant_applicant_types)
+    provinces = relationship("Province", secondary=grant_provinces)
+    eligibility_flags = relationship("EligibilityFlag", secondary=grant_eligibility_flags)
     
     def __repr__(self):
         return f"<Grant {self.name}>"
@@ -0,0 +1,28 @@
+"""Matching quality summaries written by the full match batch."""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from app.core.database import Base
+
+
+class MatchAnalytics(Base):
+    """Score distribution and lookup coverage from one full scoring run"""
+    __tablename__ = "match_analytics"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    clients = Column(Integer, nullable=False, default=0)
+    grants = Column(Integer, nullable=False, default=0)  # Open grants scored
+    pairs_scored = Column(Integer, nullable=False, default=0)
+
+    # Pair counts per 10-point bucket: 0-9, 10-19, ..., 90-99, 100
+    score_histogram = Column(JSONB, nullable=False)
+    # {category: {lookup_id: [clients, grants, clients_without_high]}}
+    coverage = Column(JSONB, nullable=False)
+    clients_without_high = Column(Integer, nullable=False, default=0)
+    clients_without_high_ids = Column(JSONB, nullable=False)  # First WITHOUT_HIGH_SAMPLE of them
+
+    def __repr__(self):
+        return f"<MatchAnalytics {self.computed_at} ({self.clients} clients)>"
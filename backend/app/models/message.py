@@ -25,6 +25,8 @@ class Message(Base):
     body = Column(Text)
     sent_to = Column(String)  # Email address
     sent_at = Column(DateTime)
+    status = Column(String, nullable=False, default="sent")  # sent, failed
+    error = Column(Text)  # Last delivery error when failed
     
     created_by_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
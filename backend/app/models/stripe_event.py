@@ -0,0 +1,31 @@
+"""Stripe webhook events, stored on receipt and applied by the Stripe worker."""
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Integer, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.database import Base
+
+
+class StripeEvent(Base):
+    """A received webhook event. The Stripe event id is the key, so redeliveries are ignored"""
+    __tablename__ = "stripe_events"
+
+    id = Column(String, primary_key=True)  # evt_...
+    type = Column(String, nullable=False)
+    customer_id = Column(String)  # Events for one customer are applied in order
+    payload = Column(JSONB, nullable=False)
+    stripe_created_at = Column(DateTime, nullable=False)
+
+    status = Column(String, nullable=False, default="pending")  # pending, processed, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text)
+
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_stripe_events_status_customer_id", "status", "customer_id", "stripe_created_at"),
+    )
+
+    def __repr__(self):
+        return f"<StripeEvent {self.id} {self.type} ({self.status})>"
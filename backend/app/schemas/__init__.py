@@ -2,7 +2,7 @@ from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserLogin, To
 from app.schemas.client import ClientCreate, ClientUpdate, ClientResponse, ClientEligibility
 from app.schemas.grant import GrantCreate, GrantUpdate, GrantResponse, GrantFilter
 from app.schemas.lookup import CauseResponse, ApplicantTypeResponse, ProvinceResponse, EligibilityFlagResponse
-from app.schemas.match import MatchCreate, MatchUpdate, MatchResponse, MatchGenerate
+from app.schemas.match import MatchCreate, MatchUpdate, MatchResponse, MatchGenerate, MatchGenerateBulk
 from app.schemas.application import (
     ApplicationCreate, ApplicationUpdate, ApplicationResponse,
     ApplicationEventCreate, ApplicationEventResponse
@@ -14,7 +14,7 @@ __all__ = [
     "ClientCreate", "ClientUpdate", "ClientResponse", "ClientEligibility",
     "GrantCreate", "GrantUpdate", "GrantResponse", "GrantFilter",
     "CauseResponse", "ApplicantTypeResponse", "ProvinceResponse", "EligibilityFlagResponse",
-    "MatchCreate", "MatchUpdate", "MatchResponse", "MatchGenerate",
+    "MatchCreate", "MatchUpdate", "MatchResponse", "MatchGenerate", "MatchGenerateBulk",
     "ApplicationCreate", "ApplicationUpdate", "ApplicationResponse",
     "ApplicationEventCreate", "ApplicationEventResponse",
     "MessageCreate", "MessageResponse"
@@ -52,6 +52,14 @@ class ClientResponse(ClientBase):
         from_attributes = True
 
 
+class SimilarClient(BaseModel):
+    """A client with its eligibility similarity (Jaccard, 0-1) to another client"""
+    client_id: UUID
+    client_name: str
+    client_type: Optional[str] = None
+    similarity: float
+
+
 class SubscriptionStatusResponse(BaseModel):
     """Response for subscription status check"""
     has_access: bool
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, model_validator
+from typing import Dict, Optional, List
 from uuid import UUID
 from datetime import datetime, date
 from decimal import Decimal
@@ -59,10 +59,41 @@ class GrantResponse(GrantBase):
     provinces: List[ProvinceResponse] = []
     eligibility_flags: List[EligibilityFlagResponse] = []
 
+    @model_validator(mode="before")
+    @classmethod
+    def lookups_from_id_arrays(cls, data):
+        """For Grant rows, build the lookup lists from the id arrays instead of loading the relationships"""
+        if isinstance(data, dict) or not hasattr(data, "cause_ids"):
+            return data
+        from app.models.associations import ELIGIBILITY_ID_ARRAYS
+        from app.services.lookup_cache import lookup_registry  # Deferred: the lookup cache imports app.schemas
+        values = {name: getattr(data, name) for name in cls.model_fields if name not in ELIGIBILITY_ID_ARRAYS and hasattr(data, name)}
+        for category, column in ELIGIBILITY_ID_ARRAYS.items():
+            values[category] = lookup_registry.items(category, getattr(data, column) or [])
+        return values
+
     class Config:
         from_attributes = True
 
 
+class ScoredGrantResponse(GrantResponse):
+    """A grant with the requesting client's fit score"""
+    fit_score: int
+    fit_level: str
+
+
+class GrantMatchPreview(BaseModel):
+    """Matching grants for a hypothetical eligibility profile (nothing is saved)"""
+    total: int
+    counts: Dict[str, int]  # Matching grants per fit level
+    results: List[ScoredGrantResponse]
+
+
+class SimilarGrantResponse(GrantResponse):
+    """A grant with its eligibility/description similarity (Jaccard, 0-1) to another grant"""
+    similarity: float
+
+
 class GrantFilter(BaseModel):
     status: Optional[GrantStatus] = None
     province_id: Optional[UUID] = None
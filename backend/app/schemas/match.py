@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 from uuid import UUID
 from datetime import datetime
@@ -35,6 +35,13 @@ class MatchResponse(MatchBase):
     updated_at: datetime
     grant: Optional[GrantResponse] = None
 
+    @field_validator("reasons")
+    @classmethod
+    def expand_stored_reasons(cls, reasons):
+        """Stored reasons hold lookup ids; return names"""
+        from app.services.matching import expand_reasons  # Deferred: the lookup cache imports app.schemas
+        return expand_reasons(reasons)
+
     class Config:
         from_attributes = True
 
@@ -45,3 +52,67 @@ class MatchGenerate(BaseModel):
     fit_score: int
     fit_level: str
     reasons: Dict[str, Any]
+    # Set when the pair is already saved as a match
+    match_id: Optional[UUID] = None
+    status: Optional[MatchStatus] = None
+
+
+class MatchGenerateBulk(BaseModel):
+    """Clients to generate recommendations for: explicit ids, or every client (optionally of one type)"""
+    client_ids: Optional[List[UUID]] = None
+    client_type: Optional[str] = None
+    limit: int = Field(20, ge=1, le=500)
+    min_score: int = Field(1, ge=0, le=100)
+    fit_level: Optional[str] = Field(None, pattern="^(high|medium|low)$")
+    exclude_status: List[MatchStatus] = [MatchStatus.rejected, MatchStatus.converted]
+
+
+class MatchExplanation(BaseModel):
+    """Score and reasons for a saved match, recomputed on request"""
+    match_id: UUID
+    fit_score: int
+    fit_level: str
+    reasons: Dict[str, Any]
+
+
+class CandidateClient(BaseModel):
+    """A client ranked against one grant (reverse matching)"""
+    client_id: UUID
+    client_name: str
+    client_type: Optional[str] = None
+    fit_score: int
+    fit_level: str
+    reasons: Dict[str, Any]
+
+
+class ScoreBucket(BaseModel):
+    min_score: int
+    max_score: int
+    count: int
+
+
+class LookupCoverage(BaseModel):
+    """Clients and open grants using one lookup, and how many of those clients lack a high fit"""
+    category: str
+    lookup_id: UUID
+    name: Optional[str] = None
+    clients: int
+    grants: int
+    clients_without_high: int
+
+
+class ClientWithoutHigh(BaseModel):
+    client_id: UUID
+    client_name: str
+
+
+class MatchAnalyticsResponse(BaseModel):
+    """Summary saved by the latest full match batch"""
+    computed_at: datetime
+    clients: int
+    grants: int
+    pairs_scored: int
+    score_histogram: List[ScoreBucket]
+    coverage: List[LookupCoverage]
+    clients_without_high: int
+    clients_without_high_sample: List[ClientWithoutHigh]
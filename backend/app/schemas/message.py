@@ -22,6 +22,8 @@ class MessageResponse(MessageBase):
     client_id: UUID
     application_id: Optional[UUID] = None
     sent_at: Optional[datetime] = None
+    status: str = "sent"
+    error: Optional[str] = None
     created_by_user_id: Optional[UUID] = None
     created_at: datetime
 
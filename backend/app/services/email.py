@@ -1,40 +1,41 @@
-import resend
 from datetime import datetime
+from typing import Optional
+from uuid import UUID
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.models.message import Message, MessageChannel
 from app.models.application import Application
 from app.models.client import Client, ClientUser
+from app.models.email_outbox import EmailOutbox
 from app.models.user import User
 
-# Initialize Resend
-resend.api_key = settings.RESEND_API_KEY
 
-
-def send_email(to: str, subject: str, html: str) -> bool:
-    """Send an email using Resend"""
-    if not settings.RESEND_API_KEY:
-        print(f"[EMAIL - NO API KEY] To: {to}, Subject: {subject}")
-        print(f"Would send: {html[:200]}...")
-        return False
-    
-    try:
-        params = {
-            "from": settings.EMAIL_FROM,
-            "to": [to],
-            "subject": subject,
-            "html": html,
-        }
-        resend.Emails.send(params)
-        print(f"[EMAIL SENT] To: {to}, Subject: {subject}")
-        return True
-    except Exception as e:
-        print(f"[EMAIL ERROR] {e}")
-        return False
+def enqueue_email(
+    db: Session,
+    to: str,
+    subject: str,
+    html: str,
+    body: Optional[str] = None,
+    client_id: Optional[UUID] = None,
+    application_id: Optional[UUID] = None
+) -> EmailOutbox:
+    """
+    Queue an email in the outbox. It is sent by the email worker once the
+    caller's transaction commits, so request handlers never wait on Resend.
+    """
+    email = EmailOutbox(
+        to_email=to,
+        subject=subject,
+        html=html,
+        body=body,
+        client_id=client_id,
+        application_id=application_id,
+    )
+    db.add(email)
+    return email
 
 
-def send_invite_email(email: str, name: str, client_name: str, invite_token: str) -> bool:
-    """Send an invite email to a client user"""
+def send_invite_email(db: Session, email: str, name: str, client_name: str, invite_token: str) -> EmailOutbox:
+    """Queue an invite email to a client user"""
     invite_url = f"{settings.FRONTEND_URL}/accept-invite?token={invite_token}"
     
     html = f"""
@@ -83,7 +84,8 @@ def send_invite_email(email: str, name: str, client_name: str, invite_token: str
     </html>
     """
     
-    return send_email(
+    return enqueue_email(
+        db,
         to=email,
         subject=f"You're invited to {client_name} on Grantus",
         html=html
@@ -132,23 +134,17 @@ Best regards,
 The Grantus Team
         """.strip()
         
-        # Send email if configured
+        # Queue email; the worker logs it to messages once sent
         html_body = body.replace('\n', '<br>')
-        send_email(user.email, subject, f"<p>{html_body}</p>")
-        
-        # Log message to database
-        message = Message(
-            client_id=client.id,
-            application_id=application.id,
-            channel=MessageChannel.email,
+        enqueue_email(
+            db,
+            to=user.email,
             subject=subject,
+            html=f"<p>{html_body}</p>",
             body=body,
-            sent_to=user.email,
-            sent_at=datetime.utcnow(),
-            created_by_user_id=None  # System-generated
+            client_id=client.id,
+            application_id=application.id
         )
-        
-        db.add(message)
     
     db.commit()
 
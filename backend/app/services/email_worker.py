@@ -0,0 +1,176 @@
+"""
+Delivers queued emails from the email_outbox table.
+
+Run alongside the API (one or more processes):
+    python -m app.services.email_worker
+    python -m app.services.email_worker --once   # drain the queue and exit
+
+Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+workers can run at once without sending an email twice. Batches go out in a
+single Resend batch call; if it fails the rows are retried with exponential
+backoff until MAX_ATTEMPTS. Emails with a client_id are logged to messages
+when sent, or with status "failed" and the last error once they run out of
+attempts. Set RESEND_API_URL to point the worker at a local fake server
+when measuring throughput.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import resend
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.models.message import Message, MessageChannel
+
+# Resend accepts at most 100 emails per batch call
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+POLL_INTERVAL_SECONDS = 2.0
+
+resend.api_key = settings.RESEND_API_KEY
+resend.api_url = settings.RESEND_API_URL
+
+
+def claim_batch(db: Session, limit: int = BATCH_SIZE) -> List[EmailOutbox]:
+    """Lock up to `limit` due emails; rows locked by other workers are skipped"""
+    return db.query(EmailOutbox).filter(
+        EmailOutbox.status == "pending",
+        EmailOutbox.next_attempt_at <= datetime.utcnow()
+    ).order_by(
+        EmailOutbox.next_attempt_at
+    ).limit(limit).with_for_update(skip_locked=True).all()
+
+
+def send_batch(emails: List[EmailOutbox]) -> List[str]:
+    """Send emails through the Resend batch API, returning provider ids in order"""
+    params = [
+        {
+            "from": settings.EMAIL_FROM,
+            "to": [email.to_email],
+            "subject": email.subject,
+            "html": email.html,
+        }
+        for email in emails
+    ]
+    if len(params) == 1:
+        return [resend.Emails.send(params[0]).get("id")]
+    response = resend.Batch.send(params)
+    return [item.get("id") for item in response.get("data", [])]
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def log_message(db: Session, email: EmailOutbox, status: str, sent_at: Optional[datetime] = None) -> None:
+    """Record the outcome against the client's messages (emails without a client_id aren't logged)"""
+    if not email.client_id:
+        return
+    db.add(Message(
+        client_id=email.client_id,
+        application_id=email.application_id,
+        channel=MessageChannel.email,
+        subject=email.subject,
+        body=email.body,
+        sent_to=email.to_email,
+        sent_at=sent_at,
+        status=status,
+        error=email.last_error,
+        created_by_user_id=None  # System-generated
+    ))
+
+
+def mark_sent(db: Session, emails: List[EmailOutbox], provider_ids: List[str]) -> None:
+    now = datetime.utcnow()
+    for index, email in enumerate(emails):
+        email.status = "sent"
+        email.attempts += 1
+        email.sent_at = now
+        email.last_error = None
+        email.provider_id = provider_ids[index] if index < len(provider_ids) else None
+        log_message(db, email, "sent", sent_at=now)
+
+
+def mark_failed(db: Session, emails: List[EmailOutbox], error: str) -> Tuple[int, int]:
+    """Schedule a retry, or give up and log the failure. Returns (retried, failed)"""
+    retried = failed = 0
+    for email in emails:
+        email.attempts += 1
+        email.last_error = error
+        if email.attempts >= MAX_ATTEMPTS:
+            email.status = "failed"
+            log_message(db, email, "failed")
+            failed += 1
+        else:
+            email.next_attempt_at = datetime.utcnow() + backoff_delay(email.attempts)
+            retried += 1
+    return retried, failed
+
+
+def process_batch(db: Session, limit: int = BATCH_SIZE) -> dict:
+    """Claim, send and record one batch. Row locks are held until the commit"""
+    stats = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0}
+    emails = claim_batch(db, limit)
+    stats["claimed"] = len(emails)
+    if not emails:
+        db.commit()
+        return stats
+
+    if not settings.RESEND_API_KEY:
+        for email in emails:
+            print(f"[EMAIL - NO API KEY] To: {email.to_email}, Subject: {email.subject}")
+        stats["retried"], stats["failed"] = mark_failed(db, emails, "RESEND_API_KEY is not set")
+    else:
+        try:
+            provider_ids = send_batch(emails)
+            mark_sent(db, emails, provider_ids)
+            stats["sent"] = len(emails)
+        except Exception as e:
+            print(f"[EMAIL ERROR] Batch of {len(emails)}: {e}")
+            stats["retried"], stats["failed"] = mark_failed(db, emails, str(e))
+
+    db.commit()
+    return stats
+
+
+def run_worker(once: bool = False, batch_size: int = BATCH_SIZE, poll_interval: float = POLL_INTERVAL_SECONDS) -> dict:
+    """Process batches until the queue is empty (once) or forever"""
+    totals = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0}
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        while True:
+            stats = process_batch(db, batch_size)
+            for key, value in stats.items():
+                totals[key] += value
+            if stats["sent"] or stats["retried"] or stats["failed"]:
+                print(f"[EMAIL WORKER] sent {stats['sent']}, retrying {stats['retried']}, failed {stats['failed']}")
+            if not stats["claimed"]:
+                if once:
+                    break
+                time.sleep(poll_interval)
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    totals["seconds"] = round(elapsed, 2)
+    totals["emails_per_second"] = round(totals["sent"] / elapsed, 1) if elapsed else totals["sent"]
+    print(
+        f"[EMAIL WORKER] {totals['sent']} sent in {totals['seconds']}s "
+        f"({totals['emails_per_second']} emails/s), {totals['retried']} retries, {totals['failed']} failed"
+    )
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send queued emails from the outbox")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Emails per Resend batch call (max 100)")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL_SECONDS, help="Seconds to sleep when idle")
+    args = parser.parse_args()
+
+    run_worker(once=args.once, batch_size=min(args.batch_size, BATCH_SIZE), poll_interval=args.poll_interval)
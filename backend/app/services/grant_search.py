@@ -0,0 +1,93 @@
+"""
+Full-text search and list filters over grants. Search uses the weighted,
+GIN-indexed search_vector column; lookup filters the GIN-indexed id arrays
+and amount filters the GiST-indexed amount_range. A deadline window is a
+range scan on (deadline_at, name, id) on its own, or on (status,
+deadline_at, name, id) when the query also filters on one status; both also
+return rows in the listing's sort order.
+"""
+import re
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+from app.models.grant import Grant
+
+SEARCH_CONFIG = "english"
+
+
+def build_prefix_tsquery(search: str) -> Optional[str]:
+    """
+    Turn free text into a tsquery string where every word is a prefix match,
+    so results update as the user types. Returns None if there are no words.
+    """
+    words = re.findall(r"[^\W_]+", search.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def apply_grant_search(query: Query, search: str) -> Tuple[Query, Optional[object]]:
+    """Filter a Grant query by full-text search; returns the query and a ts_rank expression to order by"""
+    tsquery_text = build_prefix_tsquery(search)
+    if tsquery_text is None:
+        return query, None
+
+    tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+    rank = func.ts_rank(Grant.search_vector, tsquery)
+    return query.filter(Grant.search_vector.op("@@")(tsquery)), rank
+
+
+def merge_ids(ids: Optional[List[UUID]], single: Optional[UUID]) -> List[UUID]:
+    """A list filter plus its older single-value parameter"""
+    merged = list(ids or [])
+    if single and single not in merged:
+        merged.append(single)
+    return merged
+
+
+def apply_grant_filters(
+    query: Query,
+    province_ids: Optional[List[UUID]] = None,
+    applicant_type_ids: Optional[List[UUID]] = None,
+    cause_ids: Optional[List[UUID]] = None,
+    eligibility_flag_ids: Optional[List[UUID]] = None,
+    amount_min: Optional[Decimal] = None,
+    amount_max: Optional[Decimal] = None,
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None
+) -> Query:
+    """
+    Filter a Grant query. Each id list keeps grants matching any of its ids;
+    different lists must all match. The amount bounds keep grants whose
+    funding range overlaps them (grants with no amounts are dropped), and the
+    deadline bounds keep grants with deadline_at in the inclusive window.
+    """
+    if amount_min is not None and amount_max is not None and amount_min > amount_max:
+        raise HTTPException(status_code=400, detail="amount_min must not exceed amount_max")
+    if deadline_from and deadline_to and deadline_from > deadline_to:
+        raise HTTPException(status_code=400, detail="deadline_from must not be after deadline_to")
+
+    # && per array; several lists combine as a BitmapAnd of GIN index scans
+    for column, ids in (
+        (Grant.province_ids, province_ids),
+        (Grant.applicant_type_ids, applicant_type_ids),
+        (Grant.cause_ids, cause_ids),
+        (Grant.eligibility_flag_ids, eligibility_flag_ids),
+    ):
+        if ids:
+            query = query.filter(column.overlap(ids))
+
+    if amount_min is not None or amount_max is not None:
+        query = query.filter(Grant.amount_range.overlaps(func.numrange(amount_min, amount_max, "[]")))
+
+    # (status, deadline_at) leads with status, so unscoped windows use (deadline_at, name, id)
+    if deadline_from:
+        query = query.filter(Grant.deadline_at >= deadline_from)
+    if deadline_to:
+        query = query.filter(Grant.deadline_at <= deadline_to)
+
+    return query
@@ -0,0 +1,143 @@
+"""
+Process-wide cache of the lookup tables (causes, applicant types, provinces,
+eligibility flags).
+
+The tables are tiny and rarely change, so they are loaded once at startup and
+served from memory. Any ORM insert/update/delete of a lookup row in this
+process invalidates the cache once its transaction commits; a TTL picks up
+changes made by other processes.
+Each reload bumps `version`, which caches built on top of lookups can key on.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.core.config import settings
+from app.core.database import SessionLocal, run_after_commit
+from app.models.lookup import Cause, ApplicantType, Province, EligibilityFlag
+from app.schemas.lookup import CauseResponse, ApplicantTypeResponse, ProvinceResponse, EligibilityFlagResponse
+
+LOOKUP_MODELS = {
+    "causes": (Cause, CauseResponse),
+    "applicant_types": (ApplicantType, ApplicantTypeResponse),
+    "provinces": (Province, ProvinceResponse),
+    "eligibility_flags": (EligibilityFlag, EligibilityFlagResponse),
+}
+
+
+class LookupRegistry:
+    """Versioned in-memory copy of the lookup tables"""
+
+    def __init__(self, ttl_seconds: int = settings.LOOKUP_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._lock = threading.Lock()
+        # Bumped by invalidate, so a load that read rows before it doesn't count as fresh
+        self._generation = 0
+        self._loaded_at: Optional[float] = None
+        self._rows: Dict[str, list] = {category: [] for category in LOOKUP_MODELS}
+        self._names: Dict[str, Dict[UUID, str]] = {category: {} for category in LOOKUP_MODELS}
+        self._etags: Dict[str, str] = {}
+
+    def load(self, db: Session) -> None:
+        """(Re)load every lookup table from the database"""
+        with self._lock:
+            generation = self._generation
+        rows = {}
+        names = {}
+        etags = {}
+        for category, (model, schema) in LOOKUP_MODELS.items():
+            items = [schema.model_validate(obj) for obj in db.query(model).order_by(model.name).all()]
+            rows[category] = items
+            names[category] = {item.id: item.name for item in items}
+            payload = json.dumps([item.model_dump(mode="json") for item in items], sort_keys=True)
+            etags[category] = f'"{hashlib.sha1(payload.encode()).hexdigest()}"'
+
+        with self._lock:
+            self._rows, self._names, self._etags = rows, names, etags
+            # Invalidated while reading: serve these rows, but reload on next access
+            self._loaded_at = time.monotonic() if self._generation == generation else None
+            self.version += 1
+
+    def invalidate(self) -> None:
+        """Force a reload on next access"""
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl_seconds:
+            return
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    def active(self, category: str) -> list:
+        """Active rows for a category, sorted by name"""
+        self._ensure_loaded()
+        return [item for item in self._rows[category] if item.is_active]
+
+    def etag(self, category: str) -> str:
+        """Content hash of a category, stable across processes"""
+        self._ensure_loaded()
+        return self._etags[category]
+
+    def name(self, category: str, lookup_id: UUID) -> Optional[str]:
+        self._ensure_loaded()
+        return self._names[category].get(lookup_id)
+
+    def names(self, category: str, lookup_ids: List[UUID]) -> List[str]:
+        """Names for ids, aligned with the given order"""
+        self._ensure_loaded()
+        by_id = self._names[category]
+        return [by_id.get(lookup_id, str(lookup_id)) for lookup_id in lookup_ids]
+
+    def items(self, category: str, lookup_ids: List[UUID]) -> list:
+        """Response rows for ids (sorted by name); reloads once if an id is newer than the cache"""
+        self._ensure_loaded()
+        wanted = set(lookup_ids)
+        if not wanted <= self._names[category].keys():
+            self.invalidate()
+            self._ensure_loaded()
+        return [item for item in self._rows[category] if item.id in wanted]
+
+    def ids_for_names(self, category: str, names: List[str]) -> Optional[List[UUID]]:
+        """Ids for names, aligned with the given order; None if any name is unknown or ambiguous"""
+        self._ensure_loaded()
+        ids = []
+        for name in names:
+            matches = [lookup_id for lookup_id, lookup_name in self._names[category].items() if lookup_name == name]
+            if len(matches) != 1:
+                return None
+            ids.append(matches[0])
+        return ids
+
+    def known_ids(self, category: str, lookup_ids: List[UUID]) -> List[UUID]:
+        """Keep only ids that exist in the lookup table"""
+        self._ensure_loaded()
+        by_id = self._names[category]
+        return [lookup_id for lookup_id in lookup_ids if lookup_id in by_id]
+
+    def current_version(self) -> int:
+        self._ensure_loaded()
+        return self.version
+
+
+lookup_registry = LookupRegistry()
+
+
+def _invalidate_on_change(mapper, connection, target) -> None:
+    # After commit, so a concurrent reload can't pick up the pre-commit rows and keep them for the TTL
+    run_after_commit(object_session(target), "lookup_registry", lookup_registry.invalidate)
+
+
+for _model, _ in LOOKUP_MODELS.values():
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _invalidate_on_change)
@@ -0,0 +1,115 @@
+"""
+Matching quality analytics, accumulated while the full match batch scores.
+
+run_batch feeds each shard's totals (counted in the scoring worker by
+shard_totals) to a MatchAnalyticsBuilder and saves one MatchAnalytics row at
+the end, so reading analytics is a single-row lookup rather than a rescoring
+of every client. Only the latest ANALYTICS_HISTORY rows are kept.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from app.models.match_analytics import MatchAnalytics
+from app.services.matching import CATEGORIES, EligibilityProfile, GrantCatalog
+
+HISTOGRAM_BUCKETS = 11  # 0-9, ..., 90-99, 100
+ANALYTICS_HISTORY = 30
+# Client ids kept for listing; the count covers all of them
+WITHOUT_HIGH_SAMPLE = 500
+
+# (pairs scored, score histogram, client ids with a high match) for one shard
+ShardTotals = Tuple[int, List[int], Set[UUID]]
+
+
+def shard_totals(rows: List[dict]) -> ShardTotals:
+    """Per-pair counts for one shard, taken where its rows are built (in the scoring worker)"""
+    histogram = [0] * HISTOGRAM_BUCKETS
+    with_high: Set[UUID] = set()
+    for row in rows:
+        histogram[min(row["fit_score"] // 10, HISTOGRAM_BUCKETS - 1)] += 1
+        if row["fit_level"] == "high":
+            with_high.add(row["client_id"])
+    return len(rows), histogram, with_high
+
+
+class MatchAnalyticsBuilder:
+    """Running totals over scored shards"""
+
+    def __init__(self, catalog: GrantCatalog):
+        self.grant_counts = catalog.lookup_grant_counts()
+        self.grants = len(catalog)
+        self.clients = 0
+        self.pairs_scored = 0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        # category -> lookup_id -> [clients, clients_without_high]
+        self.client_counts: Dict[str, Dict[UUID, List[int]]] = {category: {} for category in CATEGORIES}
+        self.without_high = 0
+        self.without_high_sample: List[UUID] = []
+
+    def add_shard(self, shard: List[tuple], totals: ShardTotals) -> None:
+        """Count one shard's clients (with their profiles) and its scored-row totals"""
+        pairs, histogram, with_high = totals
+        self.pairs_scored += pairs
+        for bucket, count in enumerate(histogram):
+            self.histogram[bucket] += count
+
+        for client_id, profile in shard:
+            self.clients += 1
+            has_high = client_id in with_high
+            if not has_high:
+                self.without_high += 1
+                if len(self.without_high_sample) < WITHOUT_HIGH_SAMPLE:
+                    self.without_high_sample.append(client_id)
+            self._add_profile(profile, has_high)
+
+    def _add_profile(self, profile: EligibilityProfile, has_high: bool) -> None:
+        for category in CATEGORIES:
+            for lookup_id in set(profile.ids[category]):
+                counts = self.client_counts[category].setdefault(lookup_id, [0, 0])
+                counts[0] += 1
+                if not has_high:
+                    counts[1] += 1
+
+    def coverage(self) -> Dict[str, Dict[str, List[int]]]:
+        """{category: {lookup_id: [clients, grants, clients_without_high]}} over lookups used by either side"""
+        result = {}
+        for category in CATEGORIES:
+            clients = self.client_counts[category]
+            grants = self.grant_counts.get(category, {})
+            result[category] = {
+                str(lookup_id): [
+                    clients.get(lookup_id, [0, 0])[0],
+                    grants.get(lookup_id, 0),
+                    clients.get(lookup_id, [0, 0])[1],
+                ]
+                for lookup_id in set(clients) | set(grants)
+            }
+        return result
+
+    def save(self, db: Session) -> MatchAnalytics:
+        """Write the summary row and drop rows beyond ANALYTICS_HISTORY. Commits"""
+        analytics = MatchAnalytics(
+            clients=self.clients,
+            grants=self.grants,
+            pairs_scored=self.pairs_scored,
+            score_histogram=self.histogram,
+            coverage=self.coverage(),
+            clients_without_high=self.without_high,
+            clients_without_high_ids=[str(client_id) for client_id in self.without_high_sample],
+        )
+        db.add(analytics)
+        db.flush()
+
+        stale = db.query(MatchAnalytics.id).order_by(
+            MatchAnalytics.computed_at.desc()
+        ).offset(ANALYTICS_HISTORY).all()
+        if stale:
+            db.query(MatchAnalytics).filter(
+                MatchAnalytics.id.in_([row[0] for row in stale])
+            ).delete(synchronize_session=False)
+        db.commit()
+        return analytics
+
+
+def latest_analytics(db: Session) -> Optional[MatchAnalytics]:
+    return db.query(MatchAnalytics).order_by(MatchAnalytics.computed_at.desc()).first()
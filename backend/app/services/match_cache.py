@@ -0,0 +1,96 @@
+"""
+Memoized match results and shared matching indexes.
+
+Many clients share an eligibility profile, so results are cached by a
+fingerprint of the client's four lookup id sets plus the key of the grant
+catalog snapshot they were computed from (its version and load number, so a
+TTL reload also orphans them). Any ORM insert/update/delete of a Grant in
+this process (including changes to its eligibility collections) bumps the
+version once its transaction commits, which orphans every cached result and
+the cached GrantCatalog. Bumping at flush instead would let a concurrent
+reload cache the old committed rows under the new version. The TTL bounds
+how long another process's grant edits can go unseen. The ClientIndex used for
+reverse matching is versioned the same way on Client changes.
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import run_after_commit
+from app.models.client import Client
+from app.models.grant import Grant
+from app.services.matching import CATEGORIES, EligibilityProfile, load_client_index, load_grant_catalog
+
+match_results = TTLCache(maxsize=settings.MATCH_CACHE_SIZE, ttl_seconds=settings.MATCH_CACHE_TTL_SECONDS)
+
+
+def profile_fingerprint(profile: EligibilityProfile) -> str:
+    """Canonical hash of a profile's id sets (order and duplicates don't matter)"""
+    canonical = "|".join(
+        ",".join(sorted({str(lookup_id) for lookup_id in profile.ids[category]}))
+        for category in CATEGORIES
+    )
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class VersionedSnapshot:
+    """Counter bumped on changes, plus a snapshot built by `loader` for the current version"""
+
+    def __init__(self, loader: Callable[[Session], Any], ttl_seconds: int):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._lock = threading.Lock()
+        self._loads = 0
+        self._snapshot: Any = None
+        self._snapshot_key: Optional[Tuple[int, int]] = None
+        self._loaded_at = 0.0
+
+    def bump(self) -> None:
+        with self._lock:
+            self.version += 1
+
+    def get(self, db: Session) -> Tuple[Tuple[int, int], Any]:
+        """
+        Snapshot for the current version, rebuilding it if the version moved or the TTL expired.
+        Returns (key, snapshot); the key is (version, load number), so results derived from a
+        snapshot and cached under its key never outlive it, even across same-version TTL reloads.
+        """
+        with self._lock:
+            version = self.version
+            if (
+                self._snapshot is not None
+                and self._snapshot_key[0] == version
+                and time.monotonic() - self._loaded_at < self.ttl_seconds
+            ):
+                return self._snapshot_key, self._snapshot
+
+        snapshot = self.loader(db)
+        with self._lock:
+            self._loads += 1
+            key = (version, self._loads)
+            if self.version == version:
+                self._snapshot, self._snapshot_key = snapshot, key
+                self._loaded_at = time.monotonic()
+        return key, snapshot
+
+
+grant_catalog_version = VersionedSnapshot(load_grant_catalog, ttl_seconds=settings.MATCH_CACHE_TTL_SECONDS)
+client_index_version = VersionedSnapshot(load_client_index, ttl_seconds=settings.MATCH_CACHE_TTL_SECONDS)
+
+
+def _bump_grants(mapper, connection, target) -> None:
+    run_after_commit(object_session(target), "grant_catalog_version", grant_catalog_version.bump)
+
+
+def _bump_clients(mapper, connection, target) -> None:
+    run_after_commit(object_session(target), "client_index_version", client_index_version.bump)
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Grant, _event, _bump_grants)
+    event.listen(Client, _event, _bump_clients)
@@ -0,0 +1,247 @@
+"""
+Batch materialization of Match rows: every client scored against every open grant.
+
+Meant to run nightly (cron / scheduled container):
+    python -m app.services.match_materializer --workers 4
+
+recompute_grant_matches / recompute_client_matches rescore only the stored
+matches touched by an eligibility change; the grant and client routes run
+them as background tasks.
+
+Clients are scored across a process pool (app.services.scoring_pool). Each
+worker builds its shard's rows and upserts them itself, with multi-row
+INSERT ... ON CONFLICT on unique_match_per_client_grant, and sends back only
+counts, so per-pair work never queues up in the parent. The upsert
+refreshes fit_score, fit_level and reasons but never touches the status,
+notes or owner_user_id staff have set. Each full batch also saves a
+MatchAnalytics summary (app.services.match_analytics).
+"""
+import argparse
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal, engine
+from app.models.grant import Grant
+from app.models.match import Match, MatchStatus
+from app.services.match_analytics import MatchAnalyticsBuilder, ShardTotals, shard_totals
+from app.services.matching import GrantCatalog, load_client_profiles, load_grant_catalog
+from app.services.scoring_pool import Shard, expand_rows, map_shards, score_shard
+
+# Rows per INSERT statement
+UPSERT_BATCH_SIZE = 1000
+
+# Process that owns the engine's pooled connections (see _worker_session)
+_engine_pid = os.getpid()
+
+
+def get_existing_levels(
+    db: Session,
+    client_ids: Optional[List[UUID]] = None,
+    grant_ids: Optional[List[UUID]] = None
+) -> Dict[Tuple[UUID, UUID], str]:
+    """Current fit level of stored matches, keyed by (client_id, grant_id)"""
+    query = db.query(Match.client_id, Match.grant_id, Match.fit_level)
+    if client_ids is not None:
+        query = query.filter(Match.client_id.in_(client_ids))
+    if grant_ids is not None:
+        query = query.filter(Match.grant_id.in_(grant_ids))
+    return {(client_id, grant_id): fit_level for client_id, grant_id, fit_level in query.all()}
+
+
+def upsert_matches(db: Session, rows: List[dict], existing: Dict[Tuple[UUID, UUID], str]) -> Tuple[int, int]:
+    """
+    Bulk upsert scored rows. Pairs scoring 0 are only written when a match
+    already exists (so it doesn't keep a stale score).
+    Returns (rows written, matches whose fit level changed).
+    """
+    now = datetime.utcnow()
+    values = []
+    changed = 0
+    for row in rows:
+        key = (row["client_id"], row["grant_id"])
+        if row["fit_score"] <= 0 and key not in existing:
+            continue
+        if key in existing and existing[key] != row["fit_level"]:
+            changed += 1
+        values.append({
+            **row,
+            "id": uuid.uuid4(),
+            "status": MatchStatus.new,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    for start in range(0, len(values), UPSERT_BATCH_SIZE):
+        stmt = insert(Match.__table__).values(values[start:start + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_match_per_client_grant",
+            set_={
+                "fit_score": stmt.excluded.fit_score,
+                "fit_level": stmt.excluded.fit_level,
+                "reasons": stmt.excluded.reasons,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt)
+    db.commit()
+
+    return len(values), changed
+
+
+def _worker_session() -> Session:
+    """A session for a scoring worker; forked workers first drop the connections inherited from the parent"""
+    global _engine_pid
+    if _engine_pid != os.getpid():
+        engine.dispose(close=False)
+        _engine_pid = os.getpid()
+    return SessionLocal()
+
+
+def materialize_shard(catalog: GrantCatalog, shard: Shard) -> Tuple[int, int, ShardTotals]:
+    """Pool task: score a shard, upsert its rows and return (rows written, level changes, analytics totals)"""
+    rows = expand_rows(catalog, score_shard(catalog, shard))
+    db = _worker_session()
+    try:
+        existing = get_existing_levels(db, client_ids=[client_id for client_id, _ in shard])
+        written, changed = upsert_matches(db, rows, existing)
+    finally:
+        db.close()
+    return written, changed, shard_totals(rows)
+
+
+def run_batch(db: Session, workers: Optional[int] = None, start_method: Optional[str] = None) -> dict:
+    """Score all clients against all open grants and upsert the results"""
+    started = time.perf_counter()
+
+    catalog = load_grant_catalog(db)
+    profiles = load_client_profiles(db)
+    db.commit()  # Don't hold a transaction open while the workers write
+
+    analytics = MatchAnalyticsBuilder(catalog)
+    pairs = written = changed = 0
+    for shard, (shard_written, shard_changed, totals) in map_shards(
+        catalog, profiles, materialize_shard, workers, start_method=start_method
+    ):
+        analytics.add_shard(shard, totals)
+        pairs += totals[0]
+        written += shard_written
+        changed += shard_changed
+    analytics.save(db)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "clients": len(profiles),
+        "grants": len(catalog),
+        "pairs_scored": pairs,
+        "rows_upserted": written,
+        "levels_changed": changed,
+        "seconds": round(elapsed, 2),
+        "pairs_per_second": round(pairs / elapsed) if elapsed else pairs,
+    }
+    print(
+        f"[MATCH BATCH] {stats['clients']} clients x {stats['grants']} grants: "
+        f"{pairs} pairs in {stats['seconds']}s ({stats['pairs_per_second']} pairs/s), "
+        f"{written} rows upserted, {changed} level changes"
+    )
+    return stats
+
+
+# Process-pool scoring inside the API process (full rescores and bulk generation)
+# runs one job at a time, so concurrent requests can't each spawn cpu_count workers
+_scoring_lock = threading.Lock()
+_scoring_job: Optional[str] = None
+_last_rescore: Optional[dict] = None
+
+
+def start_scoring(job: str) -> bool:
+    """Claim the scoring pool for `job` (e.g. "rescore"); False if another job holds it"""
+    global _scoring_job
+    if not _scoring_lock.acquire(blocking=False):
+        return False
+    _scoring_job = job
+    return True
+
+
+def finish_scoring() -> None:
+    global _scoring_job
+    _scoring_job = None
+    _scoring_lock.release()
+
+
+def running_scoring_job() -> Optional[str]:
+    """Name of the job holding the scoring pool in this process, if any"""
+    return _scoring_job if _scoring_lock.locked() else None
+
+
+def rescore_all(workers: Optional[int] = None) -> Optional[dict]:
+    """Run a full batch in its own session; returns None if a scoring job is already running in this process"""
+    global _last_rescore
+    if not start_scoring("rescore"):
+        return None
+    db = SessionLocal()
+    try:
+        _last_rescore = run_batch(db, workers=workers, start_method="spawn")  # Runs inside the API process
+        return _last_rescore
+    finally:
+        db.close()
+        finish_scoring()
+
+
+def last_rescore_stats() -> Optional[dict]:
+    """Stats of the last rescore_all run in this process"""
+    return _last_rescore
+
+
+def _recompute(db: Session, existing: Dict[Tuple[UUID, UUID], str]) -> Tuple[int, int]:
+    """Rescore exactly the stored pairs in `existing` and write back their new scores"""
+    client_ids = list({client_id for client_id, _ in existing})
+    grant_ids = list({grant_id for _, grant_id in existing})
+    catalog = load_grant_catalog(db, where=Grant.id.in_(grant_ids))
+
+    rows = [
+        row for row in expand_rows(catalog, score_shard(catalog, load_client_profiles(db, client_ids=client_ids)))
+        if (row["client_id"], row["grant_id"]) in existing
+    ]
+    return upsert_matches(db, rows, existing)
+
+
+def recompute_grant_matches(grant_id: UUID) -> dict:
+    """Rescore a grant's stored matches after its eligibility changed"""
+    db = SessionLocal()
+    try:
+        existing = get_existing_levels(db, grant_ids=[grant_id])
+        written, changed = _recompute(db, existing) if existing else (0, 0)
+        print(f"[MATCH RECOMPUTE] grant {grant_id}: {written} matches rescored, {changed} level changes")
+        return {"grant_id": str(grant_id), "rows_upserted": written, "levels_changed": changed}
+    finally:
+        db.close()
+
+
+def recompute_client_matches(client_id: UUID) -> dict:
+    """Rescore a client's stored matches after its eligibility profile changed"""
+    db = SessionLocal()
+    try:
+        existing = get_existing_levels(db, client_ids=[client_id])
+        written, changed = _recompute(db, existing) if existing else (0, 0)
+        print(f"[MATCH RECOMPUTE] client {client_id}: {written} matches rescored, {changed} level changes")
+        return {"client_id": str(client_id), "rows_upserted": written, "levels_changed": changed}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize matches for all clients and open grants")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: CPU count)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        run_batch(db, workers=args.workers)
+    finally:
+        db.close()
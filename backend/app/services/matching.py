@@ -0,0 +1,514 @@
+"""
+Matching engine for scoring clients against grants.
+
+Grant eligibility is encoded as one bitset per category (causes, applicant
+types, provinces, eligibility flags) so a client can be scored against the
+whole open-grant catalog in a single pass, without loading Grant ORM objects.
+Scores, fit levels and reasons are identical to calculate_fit_score.
+"""
+import heapq
+from typing import Collection, Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import Float, Integer, case, cast, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.orm import Query, Session
+from app.models.client import Client
+from app.models.grant import Grant, GrantStatus
+from app.services.lookup_cache import lookup_registry
+from app.models.associations import ELIGIBILITY_ID_ARRAYS
+
+# Eligibility categories in scoring order, with the points each is worth
+CATEGORIES = ("causes", "applicant_types", "provinces", "eligibility_flags")
+CATEGORY_POINTS = {"causes": 30, "applicant_types": 30, "provinces": 30, "eligibility_flags": 10}
+
+# Keys used in the reasons dict for each category
+REASON_KEYS = {
+    "causes": "matching_causes",
+    "applicant_types": "matching_applicant_types",
+    "provinces": "matching_provinces",
+    "eligibility_flags": "matching_flags",
+}
+
+# Issue reported when a category has requirements but nothing matches (flags are optional)
+CATEGORY_ISSUES = {
+    "causes": "No matching causes",
+    "applicant_types": "No matching applicant types",
+    "provinces": "No matching provinces",
+}
+
+# Match.reasons is stored compactly - matched lookup ids per category and the
+# categories with issues - and expanded to names at response time (expand_reasons),
+# so renamed lookups never leave stale names behind. Rows without "v" hold names.
+REASONS_VERSION = 2
+
+
+def id_arrays(model) -> list:
+    """A Grant's or Client's eligibility id array columns, in CATEGORIES order"""
+    return [getattr(model, ELIGIBILITY_ID_ARRAYS[category]) for category in CATEGORIES]
+
+
+def get_fit_level(score: int) -> str:
+    """Map a 0-100 fit score to a fit level"""
+    if score >= 80:
+        return "high"
+    elif score >= 50:
+        return "medium"
+    return "low"
+
+
+def fit_score(client: Client, grant: Grant) -> int:
+    """Numeric phase: the 0-100 fit score only, from the lookup id arrays"""
+    grant_id_sets = eligibility_ids(grant)
+    client_id_sets = eligibility_ids(client)
+    score = 0
+    for category in CATEGORIES:
+        points = CATEGORY_POINTS[category]
+        grant_ids = grant_id_sets[category]
+        if not grant_ids:
+            score += points  # No requirement = full points
+            continue
+        score += int((len(client_id_sets[category] & grant_ids) / len(grant_ids)) * points)
+    return score
+
+
+def explain_fit(client: Client, grant: Grant) -> dict:
+    """Explanation phase: matching lookup names (in client order) and issues per category"""
+    grant_id_sets = eligibility_ids(grant)
+    reasons = {key: [] for key in REASON_KEYS.values()}
+    reasons["issues"] = []
+    for category in CATEGORIES:
+        grant_ids = grant_id_sets[category]
+        if not grant_ids:
+            continue
+        matched = [item.name for item in getattr(client, category) if item.id in grant_ids]
+        reasons[REASON_KEYS[category]] = matched
+        if not matched and category in CATEGORY_ISSUES:
+            reasons["issues"].append(CATEGORY_ISSUES[category])
+    return reasons
+
+
+def calculate_fit_score(client: Client, grant: Grant) -> tuple[int, str, dict]:
+    """Calculate fit score between a client and a grant (score, fit level, reasons)"""
+    score = fit_score(client, grant)
+    return score, get_fit_level(score), explain_fit(client, grant)
+
+
+def compact_reasons(matched: Dict[str, List[UUID]], issues: List[str]) -> dict:
+    """Stored reasons: matched ids per category (empty ones omitted) and categories with issues"""
+    reasons = {"v": REASONS_VERSION}
+    for category in CATEGORIES:
+        if matched.get(category):
+            reasons[category] = [str(lookup_id) for lookup_id in matched[category]]
+    if issues:
+        reasons["issues"] = list(issues)
+    return reasons
+
+
+def expand_reasons(reasons: Optional[dict]) -> Optional[dict]:
+    """Stored reasons as returned by the API (name lists, issue messages); legacy rows pass through"""
+    if not reasons or reasons.get("v") != REASONS_VERSION:
+        return reasons
+    expanded = {
+        REASON_KEYS[category]: lookup_registry.names(category, [UUID(value) for value in reasons.get(category, [])])
+        for category in CATEGORIES
+    }
+    expanded["issues"] = [CATEGORY_ISSUES[category] for category in reasons.get("issues", [])]
+    return expanded
+
+
+def compact_named_reasons(reasons: Optional[dict]) -> Optional[dict]:
+    """
+    Convert name-based reasons (as returned by generate_matches) to the stored
+    form. Returns them unchanged if any name no longer resolves to one lookup.
+    """
+    if not reasons or "v" in reasons:
+        return reasons
+    matched = {}
+    for category in CATEGORIES:
+        ids = lookup_registry.ids_for_names(category, reasons.get(REASON_KEYS[category], []))
+        if ids is None:
+            return reasons
+        matched[category] = ids
+    issue_categories = {message: category for category, message in CATEGORY_ISSUES.items()}
+    issues = [issue_categories[message] for message in reasons.get("issues", []) if message in issue_categories]
+    if len(issues) != len(reasons.get("issues", [])):
+        return reasons
+    return compact_reasons(matched, issues)
+
+
+class EligibilityProfile:
+    """A client's eligibility ids (and lookup names, in profile order) per category"""
+
+    def __init__(self, ids: Dict[str, List[UUID]], names: Optional[Dict[str, List[str]]] = None):
+        self.ids = {category: list(ids.get(category, [])) for category in CATEGORIES}
+        self.names = {category: list((names or {}).get(category, [])) for category in CATEGORIES}
+
+    @classmethod
+    def from_ids(cls, ids: Dict[str, List[UUID]]) -> "EligibilityProfile":
+        """Build a profile from lookup ids, resolving names from the lookup cache"""
+        names = {category: lookup_registry.names(category, ids.get(category, [])) for category in CATEGORIES}
+        return cls(ids, names)
+
+    @classmethod
+    def from_client(cls, client: Client) -> "EligibilityProfile":
+        ids = {}
+        names = {}
+        for category in CATEGORIES:
+            items = getattr(client, category)
+            ids[category] = [item.id for item in items]
+            names[category] = [item.name for item in items]
+        return cls(ids, names)
+
+
+class GrantCatalog:
+    """
+    Grant eligibility encoded as bitsets, one bit per lookup id per category.
+    Grants with identical eligibility share a signature, so each distinct
+    combination is scored once per client no matter how many grants use it.
+    """
+
+    def __init__(self, grant_eligibility: List[Tuple[UUID, Dict[str, List[UUID]]]]):
+        self.grant_ids: List[UUID] = []
+        self._positions: Dict[UUID, int] = {}
+        self._bits: Dict[str, Dict[UUID, int]] = {category: {} for category in CATEGORIES}
+        # Each signature is (mask, count) per category; grants point at their signature
+        self._signatures: List[Tuple[int, ...]] = []
+        self._signature_index: Dict[Tuple[int, ...], int] = {}
+        self._signature_grants: List[int] = []  # Grants per signature
+        self._grant_signature: List[int] = []
+
+        for grant_id, eligibility in grant_eligibility:
+            signature = []
+            for category in CATEGORIES:
+                mask = self._encode(category, eligibility.get(category, []), assign=True)
+                signature.extend((mask, mask.bit_count()))
+            signature = tuple(signature)
+
+            index = self._signature_index.get(signature)
+            if index is None:
+                index = len(self._signatures)
+                self._signatures.append(signature)
+                self._signature_index[signature] = index
+                self._signature_grants.append(0)
+            self._signature_grants[index] += 1
+
+            self._positions[grant_id] = len(self.grant_ids)
+            self.grant_ids.append(grant_id)
+            self._grant_signature.append(index)
+
+    def __len__(self) -> int:
+        return len(self.grant_ids)
+
+    def __contains__(self, grant_id: UUID) -> bool:
+        return grant_id in self._positions
+
+    def _encode(self, category: str, ids: List[UUID], assign: bool = False) -> int:
+        """Pack lookup ids into a bitset (ids unknown to the catalog match no grant)"""
+        bits = self._bits[category]
+        mask = 0
+        for lookup_id in ids:
+            bit = bits.get(lookup_id)
+            if bit is None:
+                if not assign:
+                    continue
+                bit = bits[lookup_id] = len(bits)
+            mask |= 1 << bit
+        return mask
+
+    def encode_profile(self, profile: EligibilityProfile) -> Tuple[int, int, int, int]:
+        """Pack a client profile into one bitset per category"""
+        return tuple(self._encode(category, profile.ids[category]) for category in CATEGORIES)
+
+    def _score_signatures(self, masks: Tuple[int, int, int, int]) -> List[int]:
+        """Score a client (as bitsets) against every distinct grant signature"""
+        cause_mask, type_mask, province_mask, flag_mask = masks
+        scores = []
+        for cm, cn, tm, tn, pm, pn, fm, fn in self._signatures:
+            scores.append(
+                (int(((cause_mask & cm).bit_count() / cn) * 30) if cn else 30)
+                + (int(((type_mask & tm).bit_count() / tn) * 30) if tn else 30)
+                + (int(((province_mask & pm).bit_count() / pn) * 30) if pn else 30)
+                + (int(((flag_mask & fm).bit_count() / fn) * 10) if fn else 10)
+            )
+        return scores
+
+    def signature_scores(self, profile: EligibilityProfile) -> List[int]:
+        """Score a client against each distinct eligibility signature (see by_grant)"""
+        return self._score_signatures(self.encode_profile(profile))
+
+    def by_grant(self, per_signature: list) -> List[tuple]:
+        """Fan per-signature values out to every grant, in catalog order: (grant_id, value)"""
+        return [(grant_id, per_signature[index]) for grant_id, index in zip(self.grant_ids, self._grant_signature)]
+
+    def score(self, profile: EligibilityProfile) -> List[Tuple[UUID, int, str]]:
+        """Score a client against every grant, in catalog order: (grant_id, score, fit_level)"""
+        signature_scores = self.signature_scores(profile)
+        levels = [get_fit_level(score) for score in signature_scores]
+        return [
+            (grant_id, signature_scores[index], levels[index])
+            for grant_id, index in zip(self.grant_ids, self._grant_signature)
+        ]
+
+    def top(
+        self,
+        profile: EligibilityProfile,
+        limit: int,
+        min_score: int = 1,
+        fit_level: Optional[str] = None,
+        skip: int = 0,
+        exclude: Optional[Collection[UUID]] = None,
+        require_overlap: bool = False
+    ) -> List[Tuple[UUID, int, str]]:
+        """
+        Best-scoring grants, highest first (ties keep catalog order), after
+        dropping those below min_score, not at fit_level or in `exclude` (and,
+        with require_overlap, those scored_grant_query would leave out). Uses
+        a heap of skip + limit entries instead of sorting the whole catalog.
+        """
+        signature_scores, eligible = self._eligible_signatures(profile, min_score, fit_level, require_overlap)
+        candidates = (
+            (grant_id, signature_scores[index])
+            for grant_id, index in zip(self.grant_ids, self._grant_signature)
+            if eligible[index] and not (exclude and grant_id in exclude)
+        )
+        best = heapq.nlargest(skip + limit, candidates, key=lambda item: item[1])
+        return [(grant_id, score, get_fit_level(score)) for grant_id, score in best[skip:]]
+
+    def fit_level_counts(self, profile: EligibilityProfile, min_score: int = 1, require_overlap: bool = False) -> Dict[str, int]:
+        """How many grants top() could return at each fit level, without ranking them"""
+        signature_scores, eligible = self._eligible_signatures(profile, min_score, None, require_overlap)
+        counts = {"high": 0, "medium": 0, "low": 0}
+        for score, is_eligible, grants in zip(signature_scores, eligible, self._signature_grants):
+            if is_eligible:
+                counts[get_fit_level(score)] += grants
+        return counts
+
+    def lookup_grant_counts(self) -> Dict[str, Dict[UUID, int]]:
+        """How many catalog grants require each lookup, per category"""
+        counts = {}
+        for offset, category in enumerate(CATEGORIES):
+            counts[category] = {
+                lookup_id: sum(
+                    grants for signature, grants in zip(self._signatures, self._signature_grants)
+                    if signature[2 * offset] >> bit & 1
+                )
+                for lookup_id, bit in self._bits[category].items()
+            }
+        return counts
+
+    def _eligible_signatures(
+        self,
+        profile: EligibilityProfile,
+        min_score: int,
+        fit_level: Optional[str],
+        require_overlap: bool
+    ) -> Tuple[List[int], List[bool]]:
+        """Score every signature and flag those passing the filters"""
+        masks = self.encode_profile(profile)
+        signature_scores = self._score_signatures(masks)
+        # Same rule as scored_grant_query: share a lookup in each category the client filled in (flags optional)
+        overlap_offsets = [
+            offset for offset, category in enumerate(CATEGORIES)
+            if require_overlap and category in CATEGORY_ISSUES and profile.ids[category]
+        ]
+        eligible = [
+            score >= min_score
+            and (fit_level is None or get_fit_level(score) == fit_level)
+            and all(masks[offset] & signature[2 * offset] for offset in overlap_offsets)
+            for score, signature in zip(signature_scores, self._signatures)
+        ]
+        return signature_scores, eligible
+
+    def explain(self, profile: EligibilityProfile, grant_id: UUID, compact: bool = False) -> dict:
+        """Build the reasons dict for one grant, exactly as calculate_fit_score does (or its stored form)"""
+        return self.explain_signature(profile, self._grant_signature[self._positions[grant_id]], compact)
+
+    def explain_signatures(self, profile: EligibilityProfile, compact: bool = False) -> List[dict]:
+        """
+        Reasons for every signature (see by_grant). Signatures the client
+        overlaps identically share one dict, so treat the results as read-only.
+        """
+        masks = self.encode_profile(profile)
+        memo: Dict[tuple, dict] = {}
+        reasons = []
+        for index, signature in enumerate(self._signatures):
+            key = tuple(
+                (masks[offset] & signature[2 * offset], signature[2 * offset + 1] > 0)
+                for offset in range(len(CATEGORIES))
+            )
+            explained = memo.get(key)
+            if explained is None:
+                explained = memo[key] = self.explain_signature(profile, index, compact)
+            reasons.append(explained)
+        return reasons
+
+    def explain_signature(self, profile: EligibilityProfile, index: int, compact: bool = False) -> dict:
+        """Reasons dict for one distinct signature (shared by every grant that has it)"""
+        signature = self._signatures[index]
+        matched: Dict[str, List[int]] = {}
+        issues = []
+
+        for offset, category in enumerate(CATEGORIES):
+            grant_mask, grant_count = signature[2 * offset], signature[2 * offset + 1]
+            if not grant_count:
+                continue
+
+            # Positions in the profile's lists, so names keep the client's order
+            bits = self._bits[category]
+            matched[category] = [
+                position for position, lookup_id in enumerate(profile.ids[category])
+                if lookup_id in bits and grant_mask >> bits[lookup_id] & 1
+            ]
+            if not matched[category] and category in CATEGORY_ISSUES:
+                issues.append(category)
+
+        if compact:
+            return compact_reasons(
+                {category: [profile.ids[category][p] for p in positions] for category, positions in matched.items()},
+                issues
+            )
+
+        reasons = {key: [] for key in REASON_KEYS.values()}
+        for category, positions in matched.items():
+            reasons[REASON_KEYS[category]] = [profile.names[category][p] for p in positions]
+        reasons["issues"] = [CATEGORY_ISSUES[category] for category in issues]
+        return reasons
+
+
+class ClientIndex:
+    """
+    Inverted index from lookup id to the clients that have it, per category,
+    for scoring every client against one grant. Only clients sharing a lookup
+    with the grant are touched; the rest get the points for categories the
+    grant leaves open. Scores are identical to calculate_fit_score.
+    """
+
+    def __init__(self, profiles: List[Tuple[UUID, EligibilityProfile]]):
+        self.client_ids: List[UUID] = []
+        self.profiles: Dict[UUID, EligibilityProfile] = {}
+        self._postings: Dict[str, Dict[UUID, List[UUID]]] = {category: {} for category in CATEGORIES}
+
+        for client_id, profile in profiles:
+            self.client_ids.append(client_id)
+            self.profiles[client_id] = profile
+            for category in CATEGORIES:
+                postings = self._postings[category]
+                for lookup_id in set(profile.ids[category]):
+                    postings.setdefault(lookup_id, []).append(client_id)
+
+    def __len__(self) -> int:
+        return len(self.client_ids)
+
+    def score(self, eligibility: Dict[str, List[UUID]]) -> List[Tuple[UUID, int, str]]:
+        """Score every client against one grant's eligibility, in index order: (client_id, score, fit_level)"""
+        base = 0
+        partial: Dict[UUID, int] = {}
+        for category in CATEGORIES:
+            points = CATEGORY_POINTS[category]
+            required = set(eligibility.get(category, []))
+            if not required:
+                base += points
+                continue
+
+            postings = self._postings[category]
+            matched: Dict[UUID, int] = {}
+            for lookup_id in required:
+                for client_id in postings.get(lookup_id, ()):
+                    matched[client_id] = matched.get(client_id, 0) + 1
+            for client_id, count in matched.items():
+                partial[client_id] = partial.get(client_id, 0) + int((count / len(required)) * points)
+
+        results = []
+        for client_id in self.client_ids:
+            score = base + partial.get(client_id, 0)
+            results.append((client_id, score, get_fit_level(score)))
+        return results
+
+    def top(
+        self,
+        eligibility: Dict[str, List[UUID]],
+        limit: int,
+        min_score: int = 1,
+        fit_level: Optional[str] = None
+    ) -> List[Tuple[UUID, int, str]]:
+        """Best-scoring clients for a grant, highest first (ties keep index order)"""
+        candidates = (
+            row for row in self.score(eligibility)
+            if row[1] >= min_score and (fit_level is None or row[2] == fit_level)
+        )
+        return heapq.nlargest(limit, candidates, key=lambda row: row[1])
+
+
+def eligibility_ids(entity) -> Dict[str, set]:
+    """Lookup id sets per category for a loaded Grant or Client (as last read from the database)"""
+    return {category: set(getattr(entity, ELIGIBILITY_ID_ARRAYS[category]) or ()) for category in CATEGORIES}
+
+
+def load_grant_catalog(db: Session, where=None) -> GrantCatalog:
+    """
+    Build a catalog from the grants' id arrays in one query (no Grant ORM loading).
+    Defaults to open grants; pass a SQLAlchemy criterion on Grant to choose others.
+    """
+    if where is None:
+        where = Grant.status == GrantStatus.open
+    # Portal listing order, so ties in top() rank as they do in /portal/grants/matches
+    rows = db.query(Grant.id, *id_arrays(Grant)).filter(where).order_by(
+        Grant.deadline_at.asc().nullslast(), Grant.name, Grant.id
+    ).all()
+    return GrantCatalog([(row[0], dict(zip(CATEGORIES, row[1:]))) for row in rows])
+
+
+def load_client_profiles(db: Session, client_ids: Optional[List[UUID]] = None) -> List[Tuple[UUID, EligibilityProfile]]:
+    """Load eligibility profiles for many clients from their id arrays (names come from the lookup cache)"""
+    query = db.query(Client.id, *id_arrays(Client))
+    if client_ids is not None:
+        query = query.filter(Client.id.in_(client_ids))
+    return [
+        (row[0], EligibilityProfile.from_ids(dict(zip(CATEGORIES, row[1:]))))
+        for row in query.order_by(Client.id).all()
+    ]
+
+
+def load_client_index(db: Session) -> ClientIndex:
+    """Build the client inverted index from the clients' id arrays"""
+    return ClientIndex(load_client_profiles(db))
+
+
+def _matched_count(column, lookup_ids: List[UUID]):
+    """How many ids in a grant's array column are among lookup_ids"""
+    elements = func.unnest(column).table_valued("lookup_id").render_derived()
+    return select(func.count()).select_from(elements).where(
+        elements.c.lookup_id.in_(lookup_ids)
+    ).scalar_subquery()
+
+
+def scored_grant_query(db: Session, profile: EligibilityProfile, require_overlap: bool = True) -> Query:
+    """
+    Open grants with their fit score computed in Postgres, as (Grant, fit_score).
+
+    Each category contributes floor(matched / required * points), or full
+    points when the grant has no requirement - the same arithmetic as
+    calculate_fit_score. With require_overlap, grants must share at least one
+    cause, applicant type and province with the client in each of those
+    categories the client has filled in; those are && filters on the GIN
+    indexed id arrays, so Postgres can intersect the index scans and only
+    score the grants that survive.
+    """
+    terms = []
+    for category, column in zip(CATEGORIES, id_arrays(Grant)):
+        points = CATEGORY_POINTS[category]
+        required = func.cardinality(column)
+        matched = _matched_count(column, profile.ids[category])
+        terms.append(case(
+            (required == 0, points),
+            else_=cast(func.floor(cast(matched, Float) / required * points), Integer)
+        ))
+    fit_score = sum(terms[1:], terms[0]).label("fit_score")
+
+    query = db.query(Grant, fit_score).filter(Grant.status == GrantStatus.open)
+    if require_overlap:
+        for category, column in zip(CATEGORIES, id_arrays(Grant)):
+            if category in CATEGORY_ISSUES and profile.ids[category]:  # Flags are optional
+                query = query.filter(column.overlap(cast(profile.ids[category], ARRAY(PG_UUID(as_uuid=True)))))
+
+    return query
@@ -0,0 +1,260 @@
+"""
+Process-pool scoring of many clients against the open-grant catalog.
+
+Clients are split into shards and scored across a ProcessPoolExecutor. Each
+worker receives the bitset-encoded GrantCatalog once, through the pool
+initializer, and keeps it as a read-only global. Tasks carry client profiles
+in and compact results out (scores and reasons per distinct eligibility
+signature, not per grant). score_clients fans those out to match rows in
+the parent; fanning out costs about a third of the scoring time, so jobs
+over every pair (the nightly batch) run a task that builds and writes the
+rows in the worker instead and returns only counts. Results are yielded per
+shard in submission order. Any module-level task(catalog, shard) can run
+the same way through map_shards; top_clients ranks each client's best
+grants for bulk recommendations.
+
+Benchmark core scaling on synthetic data (no database needed); rows are
+built in the workers, as in the batch, and CPU time in the workers and in
+the parent is reported next to wall time:
+    python -m app.services.scoring_pool --clients 4000 --grants 2000 --workers 1,2,4
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from uuid import UUID
+from app.services.matching import CATEGORIES, EligibilityProfile, GrantCatalog, get_fit_level
+
+# Clients per process-pool task
+SHARD_SIZE = 50
+
+Shard = List[Tuple[UUID, EligibilityProfile]]
+# (client_id, score per signature, reasons per signature or None)
+ClientScores = Tuple[UUID, bytes, Optional[List[dict]]]
+
+# Set in each worker process by _init_worker so the catalog is pickled once per worker
+_worker_catalog: Optional[GrantCatalog] = None
+
+
+def _init_worker(catalog: GrantCatalog) -> None:
+    global _worker_catalog
+    _worker_catalog = catalog
+
+
+def _run_in_worker(task: Callable, shard: Shard):
+    return task(_worker_catalog, shard)
+
+
+def score_shard(catalog: GrantCatalog, shard: Shard, explain: bool = True) -> List[ClientScores]:
+    """
+    Score a shard of clients in the compact form workers send back: per client,
+    one score byte and (optionally) one stored-form reasons dict per distinct
+    signature, rather than a row per grant.
+    """
+    results = []
+    for client_id, profile in shard:
+        scores = catalog.signature_scores(profile)
+        reasons = catalog.explain_signatures(profile, compact=True) if explain else None
+        results.append((client_id, bytes(scores), reasons))
+    return results
+
+
+def expand_rows(catalog: GrantCatalog, results: List[ClientScores]) -> List[dict]:
+    """Fan compact shard results out to one match row per (client, grant)"""
+    rows = []
+    for client_id, scores, reasons in results:
+        levels = [get_fit_level(score) for score in scores]
+        for grant_id, index in catalog.by_grant(range(len(scores))):
+            row = {
+                "client_id": client_id,
+                "grant_id": grant_id,
+                "fit_score": scores[index],
+                "fit_level": levels[index],
+            }
+            if reasons is not None:
+                row["reasons"] = reasons[index]
+            rows.append(row)
+    return rows
+
+
+def top_shard(
+    catalog: GrantCatalog,
+    shard: Shard,
+    limit: int,
+    min_score: int = 1,
+    fit_level: Optional[str] = None,
+    exclude: Optional[Dict[UUID, Set[UUID]]] = None
+) -> List[Tuple[UUID, List[Tuple[UUID, int, str]]]]:
+    """Each client's best grants (see GrantCatalog.top), minus its `exclude` grant ids; small enough to send back as-is"""
+    exclude = exclude or {}
+    return [
+        (client_id, catalog.top(profile, limit, min_score=min_score, fit_level=fit_level, exclude=exclude.get(client_id)))
+        for client_id, profile in shard
+    ]
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def map_shards(
+    catalog: GrantCatalog,
+    profiles: Shard,
+    task: Callable[[GrantCatalog, Shard], list],
+    workers: Optional[int] = None,
+    shard_size: int = SHARD_SIZE,
+    start_method: Optional[str] = None
+) -> Iterator[Tuple[Shard, list]]:
+    """
+    Run a module-level `task(catalog, shard)` over client shards across
+    `workers` processes, yielding (shard, result) in order as results arrive.
+    start_method picks the multiprocessing start method; callers inside the
+    API process pass "spawn" so workers don't inherit its threads and
+    connections (at the cost of re-importing the app in each worker).
+    Closing the generator early cancels shards that haven't started.
+    """
+    workers = workers or default_workers()
+    shards = [profiles[i:i + shard_size] for i in range(0, len(profiles), shard_size)]
+
+    if workers == 1 or len(shards) <= 1:
+        for shard in shards:
+            yield shard, task(catalog, shard)
+        return
+
+    context = multiprocessing.get_context(start_method)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(catalog,))
+    try:
+        futures = [pool.submit(_run_in_worker, task, shard) for shard in shards]
+        for shard, future in zip(shards, futures):
+            yield shard, future.result()
+    finally:
+        # If the caller stops early (closing the generator), drop queued shards and wait only for running ones
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def score_clients(
+    catalog: GrantCatalog,
+    profiles: Shard,
+    workers: Optional[int] = None,
+    shard_size: int = SHARD_SIZE,
+    explain: bool = True,
+    start_method: Optional[str] = None
+) -> Iterator[Tuple[Shard, List[dict]]]:
+    """Score clients against every grant across processes, yielding (shard, match rows) in order"""
+    task = partial(score_shard, explain=explain)
+    for shard, results in map_shards(catalog, profiles, task, workers, shard_size, start_method):
+        yield shard, expand_rows(catalog, results)
+
+
+def top_clients(
+    catalog: GrantCatalog,
+    profiles: Shard,
+    limit: int,
+    min_score: int = 1,
+    fit_level: Optional[str] = None,
+    exclude: Optional[Dict[UUID, Set[UUID]]] = None,
+    workers: Optional[int] = None,
+    start_method: Optional[str] = None
+) -> Iterator[Tuple[Shard, List[Tuple[UUID, List[Tuple[UUID, int, str]]]]]]:
+    """Rank each client's best grants across processes, yielding (shard, per-client top lists) in order"""
+    task = partial(top_shard, limit=limit, min_score=min_score, fit_level=fit_level, exclude=exclude)
+    yield from map_shards(catalog, profiles, task, workers, start_method=start_method)
+
+
+def score_all(
+    catalog: GrantCatalog,
+    profiles: Shard,
+    workers: Optional[int] = None,
+    explain: bool = True
+) -> List[dict]:
+    """Score clients across processes and merge every shard's rows"""
+    rows = []
+    for _, shard_rows in score_clients(catalog, profiles, workers=workers, explain=explain):
+        rows.extend(shard_rows)
+    return rows
+
+
+def _synthetic_data(clients: int, grants: int, lookups: int = 20) -> Tuple[GrantCatalog, Shard]:
+    rng = random.Random(42)
+    ids = {category: [uuid.uuid4() for _ in range(lookups)] for category in CATEGORIES}
+
+    def pick(category: str, most: int) -> List[UUID]:
+        return rng.sample(ids[category], rng.randint(0, most))
+
+    catalog = GrantCatalog([
+        (uuid.uuid4(), {category: pick(category, 4) for category in CATEGORIES})
+        for _ in range(grants)
+    ])
+    profiles = [
+        (uuid.uuid4(), EligibilityProfile(
+            {category: pick(category, 5) for category in CATEGORIES},
+            {category: [] for category in CATEGORIES}
+        ))
+        for _ in range(clients)
+    ]
+    return catalog, profiles
+
+
+def _benchmark_shard(catalog: GrantCatalog, shard: Shard, explain: bool = True) -> Tuple[int, float]:
+    """Score a shard and build its rows in the worker, as the batch does. Returns (pairs, CPU seconds)"""
+    started = time.process_time()
+    rows = expand_rows(catalog, score_shard(catalog, shard, explain=explain))
+    return len(rows), time.process_time() - started
+
+
+def benchmark(clients: int, grants: int, worker_counts: List[int], explain: bool) -> List[dict]:
+    """Time scoring plus row building on synthetic data for each worker count"""
+    catalog, profiles = _synthetic_data(clients, grants)
+    task = partial(_benchmark_shard, explain=explain)
+    results = []
+    baseline = None
+    for workers in worker_counts:
+        started = time.perf_counter()
+        parent_started = time.process_time()
+        pairs = 0
+        worker_seconds = 0.0
+        for _, (shard_pairs, seconds) in map_shards(catalog, profiles, task, workers):
+            pairs += shard_pairs
+            worker_seconds += seconds
+        elapsed = time.perf_counter() - started
+        parent_seconds = time.process_time() - parent_started
+        baseline = baseline or elapsed
+        result = {
+            "workers": workers,
+            "pairs": pairs,
+            "seconds": round(elapsed, 2),
+            "worker_cpu_seconds": round(worker_seconds, 2),
+            "parent_cpu_seconds": round(parent_seconds, 2),
+            "pairs_per_second": round(pairs / elapsed),
+            "speedup": round(baseline / elapsed, 2),
+        }
+        results.append(result)
+        print(
+            f"[SCORING BENCH] {workers} workers: {pairs} pairs in {result['seconds']}s "
+            f"({result['pairs_per_second']} pairs/s, {result['speedup']}x; CPU {result['worker_cpu_seconds']}s "
+            f"in workers, {result['parent_cpu_seconds']}s in parent)"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark process-pool scoring on synthetic data")
+    parser.add_argument("--clients", type=int, default=4000)
+    parser.add_argument("--grants", type=int, default=2000)
+    parser.add_argument("--workers", default=None, help="Comma-separated worker counts (default: 1,2,4,... up to CPU count)")
+    parser.add_argument("--no-explain", action="store_true", help="Skip building reasons (scores only)")
+    args = parser.parse_args()
+
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(",")]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= default_workers():
+            counts.append(counts[-1] * 2)
+
+    benchmark(args.clients, args.grants, counts, explain=not args.no_explain)
@@ -0,0 +1,241 @@
+"""
+MinHash/LSH indexes for "similar grants" and "similar clients".
+
+Each grant or client is reduced to a token set: its eligibility lookup ids,
+tagged by category, plus two-word shingles of the description for grants.
+A MinHash signature of NUM_PERM values is split into BANDS bands, and each
+band is hashed into a bucket. A query only compares against entities that
+share a bucket with it, instead of scanning every row. Pairs above roughly
+(1 / BANDS) ** (1 / ROWS) Jaccard similarity (about 0.5) are very likely to
+collide. Candidates are then ranked by exact Jaccard over the stored token
+sets.
+
+The grant index holds open grants; any grant (open or not) can be the query.
+Both indexes are built by a background thread started with the app, and
+rebuilt every SIMILARITY_INDEX_TTL_SECONDS to pick up changes made by other
+processes; each build is swapped in whole, so queries never wait on one.
+Between builds, committed ORM insert/update/delete of a Grant or Client
+marks its id dirty, and the next query re-reads just those rows.
+"""
+import hashlib
+import heapq
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.core.config import settings
+from app.core.database import SessionLocal, run_after_commit
+from app.models.client import Client
+from app.models.grant import Grant, GrantStatus
+from app.services.matching import CATEGORIES, id_arrays
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 2
+# Wait before retrying a failed background build
+REBUILD_RETRY_SECONDS = 60
+
+# Universal hashing (a * x + b) mod p with a fixed seed, so signatures are stable across processes
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20260301)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+Tokens = FrozenSet[str]
+
+
+def shingles(text: Optional[str]) -> Set[str]:
+    """Word n-grams of free text (the whole text as one token if it's shorter than SHINGLE_SIZE words)"""
+    words = re.findall(r"[^\W_]+", (text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        return {"text:" + " ".join(words)} if words else set()
+    return {"text:" + " ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(tokens: Iterable[str]) -> Tuple[int, ...]:
+    """NUM_PERM minimum hash values; two sets agree at each position with probability equal to their Jaccard"""
+    hashes = [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big") for token in tokens]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a: Tokens, b: Tokens) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class SimilarityIndex:
+    """LSH buckets over MinHash signatures, plus each entity's token set for exact ranking"""
+
+    def __init__(self):
+        self._tokens: Dict[UUID, Tokens] = {}
+        self._bands: Dict[UUID, List[tuple]] = {}
+        self._buckets: List[Dict[tuple, Set[UUID]]] = [defaultdict(set) for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    @staticmethod
+    def _band_keys(tokens: Tokens) -> List[tuple]:
+        signature = minhash(tokens)
+        return [signature[band * ROWS:(band + 1) * ROWS] for band in range(BANDS)]
+
+    def add(self, key: UUID, tokens: Iterable[str]) -> None:
+        """Insert or replace an entity (an empty token set just removes it)"""
+        self.remove(key)
+        tokens = frozenset(tokens)
+        if not tokens:
+            return
+        bands = self._band_keys(tokens)
+        for band, band_key in enumerate(bands):
+            self._buckets[band][band_key].add(key)
+        self._tokens[key] = tokens
+        self._bands[key] = bands
+
+    def remove(self, key: UUID) -> None:
+        bands = self._bands.pop(key, None)
+        if bands is None:
+            return
+        del self._tokens[key]
+        for band, band_key in enumerate(bands):
+            bucket = self._buckets[band][band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band][band_key]
+
+    def query(self, tokens: Iterable[str], limit: int, exclude: Optional[UUID] = None) -> List[Tuple[UUID, float]]:
+        """Most similar entities sharing an LSH bucket with `tokens`, best first: (key, jaccard)"""
+        tokens = frozenset(tokens)
+        if not tokens:
+            return []
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(tokens)):
+            candidates |= self._buckets[band].get(band_key, set())
+        candidates.discard(exclude)
+        scored = ((key, jaccard(tokens, self._tokens[key])) for key in candidates)
+        return heapq.nlargest(limit, scored, key=lambda item: item[1])
+
+
+class IndexNotReady(Exception):
+    """The first build of an IncrementalIndex hasn't finished yet"""
+
+
+class IncrementalIndex:
+    """
+    A SimilarityIndex kept current by re-reading only the rows marked dirty.
+    `load_tokens(db, ids)` returns token sets for the given ids (all rows when
+    ids is None); ids it leaves out are removed from the index. Full builds
+    run in a background thread (see start) and are swapped in when done, so
+    queries only ever apply the dirty rows.
+    """
+
+    def __init__(self, load_tokens: Callable[[Session, Optional[List[UUID]]], Dict[UUID, Set[str]]], ttl_seconds: int):
+        self.load_tokens = load_tokens
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._index: Optional[SimilarityIndex] = None
+        self._dirty: Set[UUID] = set()
+        # Ids marked while a build is reading rows; re-applied once it is swapped in
+        self._marked_during_build: Optional[Set[UUID]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def mark_dirty(self, key: UUID) -> None:
+        with self._lock:
+            self._dirty.add(key)
+            if self._marked_during_build is not None:
+                self._marked_during_build.add(key)
+
+    def rebuild(self) -> None:
+        """Build a fresh index in its own session, then swap it in"""
+        with self._lock:
+            self._marked_during_build = set()
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            index = SimilarityIndex()
+            for key, tokens in self.load_tokens(db, None).items():
+                index.add(key, tokens)
+        except Exception:
+            with self._lock:
+                self._marked_during_build = None
+            raise
+        finally:
+            db.close()
+        with self._lock:
+            # The old index may already have applied these from rows older than the build read
+            self._dirty |= self._marked_during_build
+            self._index, self._marked_during_build = index, None
+        print(f"[SIMILARITY] Built index of {len(index)} entries in {time.monotonic() - started:.1f}s")
+
+    def _rebuild_forever(self) -> None:
+        while True:
+            try:
+                self.rebuild()
+                delay = self.ttl_seconds
+            except Exception as e:
+                print(f"[SIMILARITY] Build failed: {e}")
+                delay = min(self.ttl_seconds, REBUILD_RETRY_SECONDS)
+            time.sleep(delay)
+
+    def start(self) -> None:
+        """Build now, then every ttl_seconds (picking up other processes' changes), in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._rebuild_forever, name="similarity-index", daemon=True)
+            self._thread.start()
+
+    def query(self, db: Session, tokens: Iterable[str], limit: int, exclude: Optional[UUID] = None) -> List[Tuple[UUID, float]]:
+        """Re-read dirty rows, then query; raises IndexNotReady before the first build completes"""
+        with self._lock:
+            if self._index is None:
+                raise IndexNotReady()
+            if self._dirty:
+                keys, self._dirty = list(self._dirty), set()
+                loaded = self.load_tokens(db, keys)
+                for key in keys:
+                    self._index.add(key, loaded.get(key, ()))
+            return self._index.query(tokens, limit, exclude=exclude)
+
+
+def _eligibility_tokens(id_sets) -> Set[str]:
+    """Tokens like "causes:<lookup id>" from a row's id arrays (in CATEGORIES order)"""
+    return {f"{category}:{lookup_id}" for category, ids in zip(CATEGORIES, id_sets) for lookup_id in ids}
+
+
+def grant_tokens(db: Session, grant_ids: Optional[List[UUID]] = None, open_only: bool = True) -> Dict[UUID, Set[str]]:
+    """Eligibility and description tokens for grants (open ones only, unless open_only is False)"""
+    query = db.query(Grant.id, Grant.description, *id_arrays(Grant))
+    if open_only:
+        query = query.filter(Grant.status == GrantStatus.open)
+    if grant_ids is not None:
+        query = query.filter(Grant.id.in_(grant_ids))
+    return {row[0]: shingles(row[1]) | _eligibility_tokens(row[2:]) for row in query.all()}
+
+
+def client_tokens(db: Session, client_ids: Optional[List[UUID]] = None) -> Dict[UUID, Set[str]]:
+    """Eligibility tokens for clients"""
+    query = db.query(Client.id, *id_arrays(Client))
+    if client_ids is not None:
+        query = query.filter(Client.id.in_(client_ids))
+    return {row[0]: _eligibility_tokens(row[1:]) for row in query.all()}
+
+
+grant_similarity = IncrementalIndex(grant_tokens, ttl_seconds=settings.SIMILARITY_INDEX_TTL_SECONDS)
+client_similarity = IncrementalIndex(client_tokens, ttl_seconds=settings.SIMILARITY_INDEX_TTL_SECONDS)
+
+
+def _mark_grant(mapper, connection, target) -> None:
+    key = target.id
+    run_after_commit(object_session(target), ("grant_similarity", key), lambda: grant_similarity.mark_dirty(key))
+
+
+def _mark_client(mapper, connection, target) -> None:
+    key = target.id
+    run_after_commit(object_session(target), ("client_similarity", key), lambda: client_similarity.mark_dirty(key))
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Grant, _event, _mark_grant)
+    event.listen(Client, _event, _mark_client)
@@ -5,9 +5,11 @@ import stripe
 from datetime import datetime
 from typing import Optional, Dict, Any
 from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.models.client import Client
+from app.models.stripe_event import StripeEvent
 
 # Initialize Stripe with secret key
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -95,9 +97,8 @@ def handle_checkout_completed(session: Dict[str, Any], db: Session) -> None:
         client.subscription_id = subscription_id
         client.subscription_status = subscription.status
         client.subscription_price_id = subscription["items"]["data"][0]["price"]["id"]
-        client.current_period_end = datetime.fromtimestamp(subscription.current_period_end)
+        client.current_period_end = datetime.utcfromtimestamp(subscription.current_period_end)
         client.grant_db_access = True  # Grant access on successful checkout
-        db.commit()
 
 
 def handle_subscription_updated(subscription: Dict[str, Any], db: Session) -> None:
@@ -111,7 +112,7 @@ def handle_subscription_updated(subscription: Dict[str, Any], db: Session) -> No
         return
     
     client.subscription_status = subscription.get("status")
-    client.current_period_end = datetime.fromtimestamp(subscription.get("current_period_end", 0))
+    client.current_period_end = datetime.utcfromtimestamp(subscription.get("current_period_end", 0))
     
     # Update access based on status
     status = subscription.get("status")
@@ -120,8 +121,6 @@ def handle_subscription_updated(subscription: Dict[str, Any], db: Session) -> No
     elif status in ["canceled", "unpaid", "incomplete_expired"]:
         client.grant_db_access = False
     # past_due: keep access during grace period (Stripe retries)
-    
-    db.commit()
 
 
 def handle_subscription_deleted(subscription: Dict[str, Any], db: Session) -> None:
@@ -136,7 +135,6 @@ def handle_subscription_deleted(subscription: Dict[str, Any], db: Session) -> No
     
     client.subscription_status = "canceled"
     client.grant_db_access = False
-    db.commit()
 
 
 def handle_invoice_payment_failed(invoice: Dict[str, Any], db: Session) -> None:
@@ -151,7 +149,6 @@ def handle_invoice_payment_failed(invoice: Dict[str, Any], db: Session) -> None:
     
     client.subscription_status = "past_due"
     # Keep access during grace period - Stripe will retry
-    db.commit()
 
 
 def handle_invoice_paid(invoice: Dict[str, Any], db: Session) -> None:
@@ -166,7 +163,49 @@ def handle_invoice_paid(invoice: Dict[str, Any], db: Session) -> None:
     
     client.subscription_status = "active"
     client.grant_db_access = True
+
+
+def handle_webhook_event(event: Dict[str, Any], db: Session) -> None:
+    """Dispatch a webhook event to its handler. Changes are committed by the caller"""
+    event_type = event.get("type")
+    event_data = event.get("data", {}).get("object", {})
+    
+    if event_type == "checkout.session.completed":
+        handle_checkout_completed(event_data, db)
+    
+    elif event_type == "customer.subscription.updated":
+        handle_subscription_updated(event_data, db)
+    
+    elif event_type == "customer.subscription.deleted":
+        handle_subscription_deleted(event_data, db)
+    
+    elif event_type == "invoice.payment_failed":
+        handle_invoice_payment_failed(event_data, db)
+    
+    elif event_type == "invoice.paid":
+        handle_invoice_paid(event_data, db)
+
+
+def record_webhook_event(event: Dict[str, Any], db: Session) -> bool:
+    """
+    Store a verified webhook event for the Stripe worker.
+    Returns False if the event id was already received (a redelivery).
+    """
+    event_data = event.get("data", {}).get("object", {})
+    stmt = insert(StripeEvent.__table__).values(
+        id=event["id"],
+        type=event.get("type"),
+        customer_id=event_data.get("customer"),
+        payload=dict(event),
+        stripe_created_at=datetime.utcfromtimestamp(event.get("created", 0)),
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+        received_at=datetime.utcnow(),
+    ).on_conflict_do_nothing(index_elements=["id"])
+    result = db.execute(stmt)
     db.commit()
+    return result.rowcount == 1
 
 
 def verify_webhook_signature(payload: bytes, sig_header: str) -> Dict[str, Any]:
@@ -0,0 +1,157 @@
+"""
+Applies stored Stripe webhook events to clients.
+
+Run alongside the API:
+    python -m app.services.stripe_worker
+    python -m app.services.stripe_worker --once   # drain the queue and exit
+
+The webhook endpoint only stores events (keyed by Stripe event id, so
+redeliveries are dropped) and returns 200. This worker applies them in
+Stripe's creation order per customer: each customer's events are processed
+under a transaction-scoped advisory lock, so several workers can run without
+applying one customer's events concurrently or out of order. A failing event
+is retried with exponential backoff and holds back that customer's later
+events until it succeeds or reaches MAX_ATTEMPTS.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.stripe_event import StripeEvent
+from app.services.stripe_service import handle_webhook_event
+
+# Customers locked and processed per pass
+CUSTOMERS_PER_PASS = 50
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+POLL_INTERVAL_SECONDS = 1.0
+
+# First key of the two-part advisory lock, so these locks can't collide with others
+ADVISORY_LOCK_NAMESPACE = 7301
+
+# Events without a customer are ordered on their own
+ORDERING_KEY = func.coalesce(StripeEvent.customer_id, StripeEvent.id)
+
+
+def due_customers(db: Session, limit: int = CUSTOMERS_PER_PASS) -> List[str]:
+    """Ordering keys whose next pending event is due, oldest first
+
+    Only the head event matters: process_customer stops at it while it is
+    backing off, so a customer with due events behind it has nothing to do.
+    """
+    heads = db.query(
+        ORDERING_KEY.label("key"), StripeEvent.stripe_created_at, StripeEvent.next_attempt_at
+    ).filter(
+        StripeEvent.status == "pending"
+    ).distinct(ORDERING_KEY).order_by(
+        ORDERING_KEY, StripeEvent.stripe_created_at, StripeEvent.received_at
+    ).subquery()
+    rows = db.query(heads.c.key).filter(
+        heads.c.next_attempt_at <= datetime.utcnow()
+    ).order_by(heads.c.stripe_created_at).limit(limit).all()
+    return [row[0] for row in rows]
+
+
+def try_lock_customer(db: Session, key: str) -> bool:
+    """Take the customer's advisory lock for the rest of the transaction, if free"""
+    return db.execute(
+        select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_NAMESPACE, func.hashtext(key)))
+    ).scalar()
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def process_customer(db: Session, key: str) -> dict:
+    """Apply a customer's pending events in order. Caller holds the lock and commits"""
+    stats = {"processed": 0, "retried": 0, "failed": 0}
+    events = db.query(StripeEvent).filter(
+        StripeEvent.status == "pending",
+        ORDERING_KEY == key
+    ).order_by(StripeEvent.stripe_created_at, StripeEvent.received_at).all()
+
+    for event in events:
+        now = datetime.utcnow()
+        if event.next_attempt_at > now:
+            break  # An earlier event is waiting to be retried
+
+        event.attempts += 1
+        try:
+            with db.begin_nested():
+                handle_webhook_event(event.payload, db)
+        except Exception as e:
+            print(f"[STRIPE WORKER] {event.type} {event.id} failed (attempt {event.attempts}): {e}")
+            event.last_error = str(e)
+            if event.attempts >= MAX_ATTEMPTS:
+                event.status = "failed"
+                stats["failed"] += 1
+                continue
+            event.next_attempt_at = now + backoff_delay(event.attempts)
+            stats["retried"] += 1
+            break
+
+        event.status = "processed"
+        event.processed_at = now
+        event.last_error = None
+        stats["processed"] += 1
+
+    return stats
+
+
+def process_pass(db: Session) -> dict:
+    """One pass over customers with due events. Each customer is its own transaction"""
+    totals = {"customers": 0, "processed": 0, "retried": 0, "failed": 0}
+    keys = due_customers(db)
+    db.commit()
+
+    for key in keys:
+        if not try_lock_customer(db, key):
+            db.rollback()
+            continue  # Another worker has this customer
+        stats = process_customer(db, key)
+        db.commit()  # Also releases the advisory lock
+        totals["customers"] += 1
+        for name, value in stats.items():
+            totals[name] += value
+
+    return totals
+
+
+def run_worker(once: bool = False, poll_interval: float = POLL_INTERVAL_SECONDS) -> dict:
+    """Apply events until nothing is due (once) or forever"""
+    totals = {"customers": 0, "processed": 0, "retried": 0, "failed": 0}
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        while True:
+            stats = process_pass(db)
+            for name, value in stats.items():
+                totals[name] += value
+            if stats["processed"] or stats["retried"] or stats["failed"]:
+                print(
+                    f"[STRIPE WORKER] {stats['processed']} events applied for {stats['customers']} customers, "
+                    f"{stats['retried']} retrying, {stats['failed']} failed"
+                )
+            if not stats["processed"] and not stats["failed"]:
+                if once:
+                    break
+                time.sleep(poll_interval)
+    finally:
+        db.close()
+
+    totals["seconds"] = round(time.perf_counter() - started, 2)
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply stored Stripe webhook events")
+    parser.add_argument("--once", action="store_true", help="Exit when no events are due")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL_SECONDS, help="Seconds to sleep when idle")
+    args = parser.parse_args()
+
+    run_worker(once=args.once, poll_interval=args.poll_interval)
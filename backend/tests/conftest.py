@@ -0,0 +1,52 @@
+"""
+Tests run against the database in DATABASE_URL, migrated to head. Each test
+works inside a transaction on one connection that is rolled back afterwards,
+so nothing it writes (including commits made by routes) is kept.
+"""
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.core.database import engine, get_db
+from app.core.security import Principal, get_current_user
+from app.main import app
+from app.models.user import User, UserRole
+
+
+@pytest.fixture
+def connection():
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            yield connection
+        finally:
+            transaction.rollback()
+
+
+@pytest.fixture
+def db(connection):
+    # Route commits become savepoints inside the outer transaction
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def staff_user(db):
+    user = User(email=f"staff-{uuid.uuid4()}@example.com", name="Test Staff", role=UserRole.staff, is_active=True)
+    db.add(user)
+    db.flush()
+    return user
+
+
+@pytest.fixture
+def api(db, staff_user):
+    """TestClient using the test session, authenticated as a staff user"""
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: Principal(staff_user, ())
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,78 @@
+"""Migration 009 (compact match reasons) against rows it must leave alone"""
+import importlib.util
+from pathlib import Path
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+from app.models.client import Client
+from app.models.grant import Grant
+from app.models.match import Match
+
+MIGRATION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "009_compact_match_reasons.py"
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location("compact_match_reasons", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def migration(connection):
+    """The migration module with alembic's `op` bound to the test connection"""
+    module = _load_migration()
+    with Operations.context(MigrationContext.configure(connection)):
+        yield module
+
+
+def _add_match(db, reasons):
+    client = Client(name="Migration Test Client")
+    grant = Grant(name="Migration Test Grant")
+    db.add_all([client, grant])
+    db.flush()
+    match = Match(client_id=client.id, grant_id=grant.id, fit_score=50, fit_level="medium", reasons=reasons)
+    db.add(match)
+    db.flush()
+    return match
+
+
+def _stored_reasons(db, match):
+    return db.execute(
+        text("SELECT jsonb_typeof(reasons), reasons FROM matches WHERE id = :id"), {"id": match.id}
+    ).one()
+
+
+@pytest.mark.parametrize("direction", ["upgrade", "downgrade"])
+def test_json_null_reasons_are_skipped(db, migration, direction):
+    # Matches created without reasons store JSON null, not SQL NULL
+    match = _add_match(db, None)
+    assert _stored_reasons(db, match)[0] == "null"
+
+    getattr(migration, direction)()
+
+    assert _stored_reasons(db, match)[0] == "null"
+
+
+def test_upgrade_and_downgrade_round_trip_named_reasons(db, migration):
+    cause_id, cause_name = db.execute(text("SELECT id, name FROM causes LIMIT 1")).one_or_none() or (None, None)
+    if cause_id is None:
+        pytest.skip("no causes seeded")
+    named = {
+        "matching_causes": [cause_name],
+        "matching_applicant_types": [],
+        "matching_provinces": [],
+        "matching_flags": [],
+        "issues": ["No matching provinces"],
+    }
+    match = _add_match(db, named)
+    _add_match(db, None)
+
+    migration.upgrade()
+    kind, reasons = _stored_reasons(db, match)
+    assert kind == "object"
+    assert reasons == {"v": 2, "causes": [str(cause_id)], "issues": ["provinces"]}
+
+    migration.downgrade()
+    assert _stored_reasons(db, match)[1] == named
@@ -0,0 +1,31 @@
+"""Outbox emails that run out of attempts are logged to the client's messages as failed"""
+from app.models.client import Client
+from app.models.email_outbox import EmailOutbox
+from app.models.message import Message
+from app.services.email_worker import MAX_ATTEMPTS, mark_failed
+
+
+def _queue(db, client, attempts):
+    email = EmailOutbox(
+        to_email="client@example.com", subject="Worker Test", html="<p>Hi</p>", body="Hi",
+        client_id=client.id, attempts=attempts,
+    )
+    db.add(email)
+    db.flush()
+    return email
+
+
+def test_permanent_failure_is_logged_to_messages(db):
+    client = Client(name="Email Worker Client")
+    db.add(client)
+    db.flush()
+    retrying = _queue(db, client, 0)
+    giving_up = _queue(db, client, MAX_ATTEMPTS - 1)
+
+    assert mark_failed(db, [retrying, giving_up], "provider down") == (1, 1)
+    db.flush()
+
+    messages = db.query(Message).filter(Message.client_id == client.id).all()
+    assert [(m.status, m.error, m.sent_at) for m in messages] == [("failed", "provider down", None)]
+    assert giving_up.status == "failed"
+    assert retrying.status == "pending"
@@ -0,0 +1,36 @@
+"""Cached match rankings are tied to the catalog snapshot they were computed from"""
+from sqlalchemy import text
+from app.models.client import Client
+from app.models.grant import Grant, GrantStatus
+from app.services.match_cache import VersionedSnapshot, grant_catalog_version
+
+
+def test_ttl_reload_gets_a_new_key():
+    snapshot = VersionedSnapshot(lambda db: object(), ttl_seconds=0)
+    first_key, first = snapshot.get(None)
+    second_key, second = snapshot.get(None)
+    assert first is not second
+    assert first_key != second_key
+    assert first_key[0] == second_key[0]
+
+
+def test_grants_closed_elsewhere_drop_out_after_reload(api, db, monkeypatch):
+    # Reload on every request, as if the TTL expired between them
+    monkeypatch.setattr(grant_catalog_version, "ttl_seconds", 0)
+    client = Client(name="Cache Snapshot Client")
+    db.add(client)
+    db.add_all([Grant(name=f"Cache Snapshot Grant {index}", status=GrantStatus.open) for index in range(3)])
+    db.flush()
+    params = {"limit": 5, "min_score": 0}
+
+    first = api.post(f"/api/matches/generate/{client.id}", params=params)
+    assert first.status_code == 200
+    closed = [match["grant"]["id"] for match in first.json()]
+    assert closed
+
+    # Another process closes them: no ORM events, so the catalog version doesn't move
+    db.execute(text("UPDATE grants SET status = 'closed' WHERE id::text = ANY(:ids)"), {"ids": closed})
+
+    second = api.post(f"/api/matches/generate/{client.id}", params=params)
+    assert second.status_code == 200
+    assert not {match["grant"]["id"] for match in second.json()} & set(closed)
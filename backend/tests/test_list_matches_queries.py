@@ -0,0 +1,49 @@
+"""GET /matches/ issues a fixed number of queries per page, whatever the page size"""
+import pytest
+from sqlalchemy import event
+from app.models.client import Client
+from app.models.grant import Grant
+from app.models.match import Match
+
+MATCHES = 30
+
+
+@pytest.fixture
+def client_with_matches(db):
+    client = Client(name="Query Count Client")
+    grants = [Grant(name=f"Query Count Grant {index}") for index in range(MATCHES)]
+    db.add(client)
+    db.add_all(grants)
+    db.flush()
+    db.add_all([
+        Match(client_id=client.id, grant_id=grant.id, fit_score=index, fit_level="low", reasons={"v": 2})
+        for index, grant in enumerate(grants)
+    ])
+    db.flush()
+    return client
+
+
+def _count_statements(connection, call) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+    return len(statements)
+
+
+def test_query_count_does_not_grow_with_page_size(api, connection, client_with_matches):
+    def page(limit):
+        response = api.get("/api/matches/", params={"client_id": str(client_with_matches.id), "limit": limit})
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+
+    page(1)  # Warm the lookup cache
+    counts = {limit: _count_statements(connection, lambda: page(limit)) for limit in (1, 10, MATCHES)}
+
+    assert len(set(counts.values())) == 1, counts
@@ -0,0 +1,27 @@
+"""Lookup cache invalidation happens on commit and survives a concurrent reload"""
+from sqlalchemy import event
+from app.models.lookup import Cause
+from app.services.lookup_cache import LookupRegistry, lookup_registry
+
+
+def test_invalidation_during_load_is_not_lost(db):
+    registry = LookupRegistry()
+
+    # Invalidate while load is reading rows, as a commit in another thread would
+    event.listen(db, "do_orm_execute", lambda state: registry.invalidate(), once=True)
+    registry.load(db)
+
+    assert registry._loaded_at is None
+    registry.load(db)
+    assert registry._loaded_at is not None
+
+
+def test_invalidated_on_commit_not_flush(db):
+    lookup_registry.load(db)
+
+    db.add(Cause(name="Lookup Cache Test Cause"))
+    db.flush()
+    assert lookup_registry._loaded_at is not None
+
+    db.commit()
+    assert lookup_registry._loaded_at is None
@@ -0,0 +1,113 @@
+"""Keyset cursor paging returns the same rows, in the same order, as offset paging"""
+import base64
+import json
+from datetime import date, datetime, timedelta
+import pytest
+from fastapi import HTTPException, Response
+from app.api.routes.applications import APPLICATION_SORT_KEYS
+from app.api.routes.clients import CLIENT_SORT_KEYS, MESSAGE_SORT_KEYS
+from app.api.routes.grants import GRANT_SORT_KEYS
+from app.api.routes.matches import MATCH_SORT_KEYS
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, order_by_keys, paginate
+from app.models.application import Application
+from app.models.client import Client
+from app.models.grant import Grant
+from app.models.match import Match
+from app.models.message import Message
+
+PAGE = 4
+
+
+def _cursor_pages(query, sort_keys):
+    rows, cursor = [], None
+    while True:
+        response = Response()
+        page = paginate(query, sort_keys, response, limit=PAGE, cursor=cursor)
+        rows.extend(page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return rows
+
+
+def _assert_same_order(query, sort_keys):
+    expected = query.order_by(*order_by_keys(sort_keys)).all()
+    assert [row.id for row in _cursor_pages(query, sort_keys)] == [row.id for row in expected]
+
+
+@pytest.fixture
+def client(db):
+    client = Client(name="Paging Client")
+    db.add(client)
+    db.flush()
+    return client
+
+
+def test_grants_with_null_and_tied_deadlines(db):
+    # NULL deadlines sort last; repeated deadlines and names fall back to id
+    deadlines = [date(2030, 1, 1), None, date(2030, 1, 1), date(2029, 6, 1), None, date(2031, 1, 1)] * 3
+    db.add_all([
+        Grant(name=f"Paging Grant {index % 4}", funder="paging-test", deadline_at=deadline)
+        for index, deadline in enumerate(deadlines)
+    ])
+    db.flush()
+    _assert_same_order(db.query(Grant).filter(Grant.funder == "paging-test"), GRANT_SORT_KEYS)
+
+
+def test_clients_by_name(db):
+    db.add_all([Client(name=f"Paging Client {index % 3}", entity_type="paging-test") for index in range(11)])
+    db.flush()
+    _assert_same_order(db.query(Client).filter(Client.entity_type == "paging-test"), CLIENT_SORT_KEYS)
+
+
+def test_matches_by_descending_score(db, client):
+    grants = [Grant(name=f"Paging Match Grant {index}") for index in range(13)]
+    db.add_all(grants)
+    db.flush()
+    db.add_all([
+        Match(client_id=client.id, grant_id=grant.id, fit_score=index % 5 * 20)
+        for index, grant in enumerate(grants)
+    ])
+    db.flush()
+    _assert_same_order(db.query(Match).filter(Match.client_id == client.id), MATCH_SORT_KEYS)
+
+
+def test_messages_newest_first_with_unsent(db, client):
+    # Descending keys sort NULLS FIRST, so unsent messages lead
+    start = datetime(2030, 1, 1)
+    db.add_all([
+        Message(client_id=client.id, sent_at=None if index % 4 == 0 else start + timedelta(days=index % 3))
+        for index in range(14)
+    ])
+    db.flush()
+    _assert_same_order(db.query(Message).filter(Message.client_id == client.id), MESSAGE_SORT_KEYS)
+
+
+def test_applications_mixed_directions(db, client):
+    grant = Grant(name="Paging Application Grant")
+    db.add(grant)
+    db.flush()
+    updated = datetime(2030, 1, 1)
+    db.add_all([
+        Application(
+            client_id=client.id,
+            grant_id=grant.id,
+            internal_deadline_at=None if index % 3 == 0 else date(2030, 2, index % 2 + 1),
+            updated_at=updated + timedelta(hours=index % 4),
+        )
+        for index in range(13)
+    ])
+    db.flush()
+    _assert_same_order(db.query(Application).filter(Application.client_id == client.id), APPLICATION_SORT_KEYS)
+
+
+@pytest.mark.parametrize("values", [[50, 5], ["50", "x"], [None, {"id": 1}], [True, "00000000-0000-0000-0000-000000000000"]])
+def test_malformed_cursor_values_are_rejected(values):
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, MATCH_SORT_KEYS)
+    assert error.value.status_code == 400
+
+
+def test_malformed_cursor_is_400_from_the_api(api):
+    cursor = base64.urlsafe_b64encode(json.dumps([50, 5]).encode()).decode()
+    assert api.get("/api/matches/", params={"cursor": cursor}).status_code == 400
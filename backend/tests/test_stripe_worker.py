@@ -0,0 +1,24 @@
+"""The Stripe worker only picks customers whose next event is due"""
+from datetime import datetime, timedelta
+from app.models.stripe_event import StripeEvent
+from app.services.stripe_worker import due_customers
+
+
+def _event(db, event_id, customer, created_minutes, retry_in_minutes=0):
+    now = datetime.utcnow()
+    db.add(StripeEvent(
+        id=event_id, type="invoice.paid", customer_id=customer, payload={},
+        stripe_created_at=now - timedelta(minutes=created_minutes),
+        next_attempt_at=now + timedelta(minutes=retry_in_minutes), received_at=now,
+    ))
+
+
+def test_customer_blocked_by_backing_off_head_is_skipped(db):
+    # cus_blocked's oldest event is backing off, so its due later event must wait
+    _event(db, "evt_due_test_1", "cus_due_test_blocked", created_minutes=30, retry_in_minutes=10)
+    _event(db, "evt_due_test_2", "cus_due_test_blocked", created_minutes=20)
+    _event(db, "evt_due_test_3", "cus_due_test_ready", created_minutes=10)
+    db.flush()
+
+    keys = [key for key in due_customers(db, limit=1000) if key.startswith("cus_due_test")]
+    assert keys == ["cus_due_test_ready"]
@@ -25,6 +25,8 @@ export default function PortalGrants() {
   const [isLoading, setIsLoading] = useState(true);
   const [showFilters, setShowFilters] = useState(false);
   const [viewMode, setViewMode] = useState<'all' | 'matches'>('all');
+  const [matchTotal, setMatchTotal] = useState(0);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   // Filter state
   const [search, setSearch] = useState(searchParams.get('search') || '');
@@ -65,7 +67,9 @@ export default function PortalGrants() {
     try {
       let data: Grant[];
       if (viewMode === 'matches') {
-        data = await portalApi.getMatchingGrants();
+        const page = await portalApi.getMatchingGrants();
+        data = page.grants;
+        setMatchTotal(page.total);
       } else {
         const params: Record<string, string> = {};
         if (search) params.search = search;
@@ -85,6 +89,19 @@ export default function PortalGrants() {
     }
   };
 
+  const loadMoreMatches = async () => {
+    setIsLoadingMore(true);
+    try {
+      const page = await portalApi.getMatchingGrants(grants.length);
+      setGrants((prev) => [...prev, ...page.grants]);
+      setMatchTotal(page.total);
+    } catch (error) {
+      toast.error('Failed to load more matches');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const clearFilters = () => {
     setSearch('');
     setCauseId('');
@@ -252,8 +269,14 @@ export default function PortalGrants() {
 
       {/* Results */}
       <div className="text-sm text-gray-500 mb-2">
-        {grants.length} {grants.length === 1 ? 'grant' : 'grants'} found
-        {viewMode === 'matches' && ' matching your profile'}
+        {viewMode === 'matches' ? (
+          <>
+            {matchTotal} {matchTotal === 1 ? 'grant' : 'grants'} matching your profile
+            {grants.length < matchTotal && ` (showing ${grants.length})`}
+          </>
+        ) : (
+          <>{grants.length} {grants.length === 1 ? 'grant' : 'grants'} found</>
+        )}
       </div>
 
       {/* Grant List */}
@@ -336,6 +359,18 @@ export default function PortalGrants() {
           ))}
         </div>
       )}
+
+      {viewMode === 'matches' && grants.length < matchTotal && (
+        <div className="text-center">
+          <button
+            onClick={loadMoreMatches}
+            disabled={isLoadingMore}
+            className="px-4 py-2 border border-gray-300 rounded-lg text-sm font-medium text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more matches'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -1,6 +1,6 @@
 import axios from 'axios';
 import type { 
-  Token, User, Grant, GrantCreate, Client, ClientCreate, ClientUser,
+  Token, User, Grant, GrantCreate, GrantPage, Client, ClientCreate, ClientUser,
   Match, MatchGenerate, Application, ApplicationCreate, ApplicationEvent,
   Cause, ApplicantType, Province, EligibilityFlag, MatchStatus, ApplicationStage,
   ClientInvite, InviteInfo, SubscriptionStatus, Prices, CheckoutResponse, BillingPortalResponse,
@@ -276,9 +276,9 @@ export const portalApi = {
     const { data } = await api.get<Grant>(`/portal/grants/${id}`);
     return data;
   },
-  getMatchingGrants: async (): Promise<Grant[]> => {
-    const { data } = await api.get<Grant[]>('/portal/grants/matches');
-    return data;
+  getMatchingGrants: async (skip = 0, limit = 100): Promise<GrantPage> => {
+    const { data, headers } = await api.get<Grant[]>('/portal/grants/matches', { params: { skip, limit } });
+    return { grants: data, total: Number(headers['x-total-count'] ?? data.length) };
   },
   // Saved Grants
   getSavedGrants: async (): Promise<SavedGrant[]> => {
@@ -70,6 +70,12 @@ export interface Grant {
   eligibility_flags: EligibilityFlag[];
 }
 
+// One page of grants plus the total across all pages (X-Total-Count)
+export interface GrantPage {
+  grants: Grant[];
+  total: number;
+}
+
 export interface GrantCreate {
   name: string;
   funder?: string;
@@ -213,6 +219,8 @@ export interface Message {
   body: string | null;
   sent_to: string | null;
   sent_at: string | null;
+  status: 'sent' | 'failed';
+  error: string | null;
   created_at: string;
 }
 